@@ -1,42 +1,210 @@
-from flask import Flask, request, render_template, jsonify, redirect, url_for
+from flask import Flask, request, render_template, jsonify, redirect, url_for, Response, stream_with_context, send_from_directory, abort, g
 from flask_sqlalchemy import SQLAlchemy
-import cv2
-import numpy as np
-from pyzbar import pyzbar
+from flask_sock import Sock
+from sqlalchemy import and_, or_, func, text, false, insert, event, inspect
+from sqlalchemy.orm import Session
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 import requests
 import os
-from datetime import datetime
+import sys
+import re
+import json
+import time
+import html
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, as_completed, FIRST_COMPLETED
+import multiprocessing
+import zipfile
+import io
+import csv
+import threading
+import itertools
+import contextvars
+import logging
+import click
+from collections import Counter
+from datetime import datetime, timedelta
 import base64
-from io import BytesIO
-from PIL import Image
+from urllib.parse import urlparse
+from tmdb import TMDbClient, TMDbRateLimited
+from ratelimit import parse_rate_limit
+from provider_stats import ProviderStats, CircuitBreaker
+import posters
+import catalogue
+import titles
+import metrics
+from metrics import record_span, span
 
 app = Flask(__name__)
 
 # Configuration
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///movies.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///movies.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['UPLOAD_FOLDER'] = 'uploads'
+app.config['POSTER_FOLDER'] = os.path.join(os.path.abspath(app.config['UPLOAD_FOLDER']), 'posters')
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 
+# Frames larger than this (longest side, pixels) are downscaled before
+# barcode decoding. 0 disables downscaling.
+app.config['SCAN_MAX_DIMENSION'] = int(os.environ.get('SCAN_MAX_DIMENSION', 1600))
+
+# Live scan stream: consecutive frames that must agree before a code is accepted
+app.config['SCAN_STREAM_CONFIRM_FRAMES'] = int(os.environ.get('SCAN_STREAM_CONFIRM_FRAMES', 3))
+
+# Worker processes for batch image decoding (defaults to one per core)
+app.config['DECODE_WORKERS'] = int(os.environ.get('DECODE_WORKERS', 0)) or os.cpu_count() or 1
+
+# Uncompressed size limits for zip uploads to /api/scan_batch (MAX_CONTENT_LENGTH only
+# limits the compressed upload). Larger images, and images past the total, are reported as errors.
+app.config['SCAN_ARCHIVE_MAX_IMAGE_SIZE'] = int(os.environ.get('SCAN_ARCHIVE_MAX_IMAGE_MB', 25)) * 1024 * 1024
+app.config['SCAN_ARCHIVE_MAX_TOTAL_SIZE'] = int(os.environ.get('SCAN_ARCHIVE_MAX_TOTAL_MB', 256)) * 1024 * 1024
+
+# Barcode lookup cache lifetimes (seconds). Misses expire sooner so newly
+# listed products get picked up without a manual invalidation.
+app.config['BARCODE_CACHE_TTL'] = int(os.environ.get('BARCODE_CACHE_TTL', 30 * 24 * 3600))
+app.config['BARCODE_CACHE_NEGATIVE_TTL'] = int(os.environ.get('BARCODE_CACHE_NEGATIVE_TTL', 6 * 3600))
+
+# Barcode provider fan-out: 'parallel' asks every provider at once,
+# 'sequential' keeps the old one-after-another fallback chain.
+app.config['BARCODE_LOOKUP_MODE'] = os.environ.get('BARCODE_LOOKUP_MODE', 'parallel')
+app.config['BARCODE_LOOKUP_DEADLINE'] = float(os.environ.get('BARCODE_LOOKUP_DEADLINE', 12))  # seconds
+app.config['BARCODE_LOOKUP_GRACE'] = float(os.environ.get('BARCODE_LOOKUP_GRACE', 0.3))  # seconds
+app.config['BARCODE_LOOKUP_WORKERS'] = int(os.environ.get('BARCODE_LOOKUP_WORKERS', 8))
+
+# Longest an interactive lookup waits for a TMDb request token before giving up
+# with a 429 (background enrichment waits as long as it takes)
+app.config['TMDB_RATE_WAIT'] = float(os.environ.get('TMDB_RATE_WAIT', 2))
+
+# Per-provider request budgets as "requests/seconds/burst" token buckets.
+# The UPCitemdb trial allows 100 lookups a day in bursts of up to 6.
+app.config['PROVIDER_RATE_LIMITS'] = {
+    'UPCitemdb': os.environ.get('UPCITEMDB_RATE_LIMIT', '100/86400/6'),
+    'Open Food Facts': os.environ.get('OPENFOODFACTS_RATE_LIMIT', '100/60/10'),
+    'Barcode Lookup API': os.environ.get('BARCODE_LOOKUP_RATE_LIMIT', '50/60/5'),
+    'TMDb': os.environ.get('TMDB_RATE_LIMIT', '40/10/20')
+}
+
+# Request budget state, shared by every worker process on this host so the
+# budgets above hold for the whole app rather than per gunicorn worker
+app.config['PROVIDER_BUDGET_PATH'] = os.environ.get('PROVIDER_BUDGET_PATH') or os.path.join(app.instance_path, 'provider_budgets.db')
+
+# Provider health: circuit breakers skip a provider for PROVIDER_BREAKER_COOLDOWN
+# seconds after PROVIDER_BREAKER_FAILURES failures in a row (or one quota
+# response). Providers that almost never return a product once
+# PROVIDER_FALLBACK_MIN_CALLS calls have been seen are only asked after the others miss.
+app.config['PROVIDER_STATS_WINDOW'] = int(os.environ.get('PROVIDER_STATS_WINDOW', 200))
+app.config['PROVIDER_BREAKER_FAILURES'] = int(os.environ.get('PROVIDER_BREAKER_FAILURES', 3))
+app.config['PROVIDER_BREAKER_COOLDOWN'] = float(os.environ.get('PROVIDER_BREAKER_COOLDOWN', 60))
+app.config['PROVIDER_FALLBACK_MIN_CALLS'] = int(os.environ.get('PROVIDER_FALLBACK_MIN_CALLS', 50))
+app.config['PROVIDER_FALLBACK_HIT_RATE'] = float(os.environ.get('PROVIDER_FALLBACK_HIT_RATE', 0.02))
+
+# Bulk barcode import jobs
+app.config['IMPORT_WORKERS'] = int(os.environ.get('IMPORT_WORKERS', 4))
+app.config['IMPORT_BATCH_SIZE'] = int(os.environ.get('IMPORT_BATCH_SIZE', 25))
+# Max seconds to wait for a provider token; the parallel fan-out caps this at
+# half of BARCODE_LOOKUP_DEADLINE
+app.config['IMPORT_RATE_WAIT'] = float(os.environ.get('IMPORT_RATE_WAIT', 30))
+app.config['IMPORT_CLAIM_TIMEOUT'] = int(os.environ.get('IMPORT_CLAIM_TIMEOUT', 600))  # seconds before a claimed item is retried
+
+# Background TMDb enrichment of incomplete or stale movies (flask enrich-movies,
+# POST /api/admin/enrichment). Incomplete movies that TMDb could not resolve are
+# retried after ENRICH_RETRY_DAYS; resolved ones are refreshed after
+# ENRICH_REFRESH_DAYS (0 disables refreshing).
+app.config['ENRICH_WORKERS'] = int(os.environ.get('ENRICH_WORKERS', 4))
+app.config['ENRICH_BATCH_SIZE'] = int(os.environ.get('ENRICH_BATCH_SIZE', 25))
+app.config['ENRICH_RETRY_DAYS'] = float(os.environ.get('ENRICH_RETRY_DAYS', 7))
+app.config['ENRICH_REFRESH_DAYS'] = float(os.environ.get('ENRICH_REFRESH_DAYS', 90))
+app.config['ENRICH_CLAIM_TIMEOUT'] = int(os.environ.get('ENRICH_CLAIM_TIMEOUT', 600))
+app.config['ENRICH_ON_ADD'] = os.environ.get('ENRICH_ON_ADD', 'true').lower() in ('1', 'true', 'yes')
+
+# Resolve product titles against movies we already know (the collection and
+# earlier TMDb results) before searching TMDb. The threshold is the trigram
+# similarity (0-1) a title needs; 1 only accepts exact matches after
+# normalization.
+app.config['LOCAL_TITLE_MATCH'] = os.environ.get('LOCAL_TITLE_MATCH', 'true').lower() in ('1', 'true', 'yes')
+app.config['TITLE_MATCH_THRESHOLD'] = float(os.environ.get('TITLE_MATCH_THRESHOLD', 0.85))
+
+# Offline UPC catalogue built from a product dump (flask import-upc-catalogue)
+app.config['UPC_CATALOGUE_PATH'] = os.environ.get('UPC_CATALOGUE_PATH') or os.path.join(app.instance_path, 'upc_catalogue.db')
+
+# SQLite settings applied to every new connection. WAL lets readers carry on
+# while another worker writes; busy_timeout (ms) makes a writer wait for the
+# lock instead of failing with "database is locked".
+app.config['SQLITE_BUSY_TIMEOUT'] = int(os.environ.get('SQLITE_BUSY_TIMEOUT', 10000))
+app.config['SQLITE_SYNCHRONOUS'] = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL').upper()
+
+# Movies with the same barcode and format count as duplicates. The batch add
+# endpoint skips, updates or allows them (DUPLICATE_POLICY is its default);
+# UNIQUE_BARCODE_FORMAT also enforces uniqueness with a database index.
+app.config['DUPLICATE_POLICY'] = os.environ.get('DUPLICATE_POLICY', 'skip')
+app.config['UNIQUE_BARCODE_FORMAT'] = os.environ.get('UNIQUE_BARCODE_FORMAT', '').lower() in ('1', 'true', 'yes')
+app.config['ADD_MOVIES_MAX_BATCH'] = int(os.environ.get('ADD_MOVIES_MAX_BATCH', 500))
+
+# Collection export/import: rows read per query and rows per import transaction
+app.config['EXPORT_BATCH_SIZE'] = int(os.environ.get('EXPORT_BATCH_SIZE', 1000))
+app.config['IMPORT_CHUNK_SIZE'] = int(os.environ.get('IMPORT_CHUNK_SIZE', 500))
+
+# Diagnostics go to the 'movie_scanner' logger. Unset, every message is
+# printed plainly as before; LOG_LEVEL (DEBUG/INFO/WARNING/ERROR) switches to
+# leveled, timestamped logging.
+app.config['LOG_LEVEL'] = os.environ.get('LOG_LEVEL', '').upper() or None
+
+# Requests slower than this (seconds) are logged with their timing spans; 0 disables
+app.config['SLOW_REQUEST_SECONDS'] = float(os.environ.get('SLOW_REQUEST_SECONDS', 0))
+
 db = SQLAlchemy(app)
+sock = Sock(app)
+
+@event.listens_for(Engine, 'connect')
+def configure_sqlite_connection(dbapi_connection, connection_record):
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    synchronous = app.config['SQLITE_SYNCHRONOUS']
+    if synchronous not in ('OFF', 'NORMAL', 'FULL', 'EXTRA'):
+        synchronous = 'NORMAL'
+
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode = WAL')
+    cursor.execute(f"PRAGMA busy_timeout = {int(app.config['SQLITE_BUSY_TIMEOUT'])}")
+    cursor.execute(f'PRAGMA synchronous = {synchronous}')
+    cursor.close()
+
+log = logging.getLogger('movie_scanner')
+
+def configure_logging():
+    handler = logging.StreamHandler(sys.stdout)
+    if app.config['LOG_LEVEL']:
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s [%(threadName)s] %(message)s'))
+        log.setLevel(app.config['LOG_LEVEL'])
+    else:
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        log.setLevel(logging.DEBUG)
+    log.handlers = [handler]
+    log.propagate = False
+
+configure_logging()
 
 # Create upload directory if it doesn't exist
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+os.makedirs(app.config['POSTER_FOLDER'], exist_ok=True)
 
 # Movie model
 class Movie(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
-    year = db.Column(db.Integer)
+    year = db.Column(db.Integer, index=True)
     director = db.Column(db.String(100))
     genre = db.Column(db.String(100))
-    format_type = db.Column(db.String(20))  # DVD, Blu-ray, 4K Blu-ray
-    barcode = db.Column(db.String(20))
+    format_type = db.Column(db.String(20), index=True)  # DVD, Blu-ray, 4K Blu-ray
+    barcode = db.Column(db.String(20), index=True)
     tmdb_id = db.Column(db.String(20))  # TMDb ID instead of IMDb ID
     poster_url = db.Column(db.String(500))
-    added_date = db.Column(db.DateTime, default=datetime.utcnow)
-    location = db.Column(db.String(100))  # Where it's stored
-    condition = db.Column(db.String(20), default='Good')
+    added_date = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    location = db.Column(db.String(100), index=True)  # Where it's stored
+    condition = db.Column(db.String(20), default='Good', index=True)
+    poster_key = db.Column(db.String(40))  # Set once the poster is mirrored locally
 
     def to_dict(self):
         return {
@@ -51,103 +219,362 @@ class Movie(db.Model):
             'poster_url': self.poster_url,
             'added_date': self.added_date.isoformat() if self.added_date else None,
             'location': self.location,
-            'condition': self.condition
+            'condition': self.condition,
+            'poster_thumb_url': f"/posters/{self.poster_key}/thumb" if self.poster_key else None,
+            'poster_medium_url': f"/posters/{self.poster_key}/medium" if self.poster_key else None
+        }
+
+# Title sorting/searching is case-insensitive, so index it the same way
+db.Index('ix_movie_title_nocase', Movie.title.collate('NOCASE'))
+
+# Optional (UNIQUE_BARCODE_FORMAT): one movie per barcode and format.
+# A missing format counts as one value; movies without a barcode are exempt.
+UNIQUE_BARCODE_INDEX_SQL = (
+    "CREATE UNIQUE INDEX IF NOT EXISTS ux_movie_barcode_format ON movie (barcode, IFNULL(format_type, '')) "
+    "WHERE barcode IS NOT NULL AND barcode != ''"
+)
+
+# Full-text index over the searchable Movie columns. It is an external
+# content FTS5 table (no second copy of the text) kept in sync by triggers,
+# so every write path - routes, bulk inserts, raw SQL - stays indexed.
+SEARCH_INDEX_SQL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS movie_fts USING fts5(
+        title, director, genre, location,
+        content='movie', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS movie_fts_ai AFTER INSERT ON movie BEGIN
+        INSERT INTO movie_fts(rowid, title, director, genre, location)
+        VALUES (new.id, new.title, new.director, new.genre, new.location);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS movie_fts_ad AFTER DELETE ON movie BEGIN
+        INSERT INTO movie_fts(movie_fts, rowid, title, director, genre, location)
+        VALUES ('delete', old.id, old.title, old.director, old.genre, old.location);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS movie_fts_au AFTER UPDATE OF title, director, genre, location ON movie BEGIN
+        INSERT INTO movie_fts(movie_fts, rowid, title, director, genre, location)
+        VALUES ('delete', old.id, old.title, old.director, old.genre, old.location);
+        INSERT INTO movie_fts(rowid, title, director, genre, location)
+        VALUES (new.id, new.title, new.director, new.genre, new.location);
+    END"""
+]
+
+# bm25 column weights: title, director, genre, location
+SEARCH_WEIGHTS = (10.0, 5.0, 2.0, 1.0)
+
+class MovieChange(db.Model):
+    """Change log behind /api/movies/changes.
+
+    Holds only the latest change per movie; every change gets a new,
+    never reused seq, so "everything after seq N" is exactly what a
+    client that synced up to N is missing. Deletes stay as tombstones.
+    """
+    __tablename__ = 'movie_change'
+    __table_args__ = {'sqlite_autoincrement': True}
+
+    seq = db.Column(db.Integer, primary_key=True)
+    movie_id = db.Column(db.Integer, nullable=False, unique=True)
+    op = db.Column(db.String(10), nullable=False)  # 'upsert' or 'delete'
+    changed_at = db.Column(db.DateTime, nullable=False, server_default=func.current_timestamp())
+
+# Written by triggers, like the search index, so every write path is logged
+CHANGE_LOG_SQL = [
+    """CREATE TRIGGER IF NOT EXISTS movie_change_ai AFTER INSERT ON movie BEGIN
+        DELETE FROM movie_change WHERE movie_id = new.id;
+        INSERT INTO movie_change (movie_id, op) VALUES (new.id, 'upsert');
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS movie_change_au AFTER UPDATE ON movie BEGIN
+        DELETE FROM movie_change WHERE movie_id = new.id;
+        INSERT INTO movie_change (movie_id, op) VALUES (new.id, 'upsert');
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS movie_change_ad AFTER DELETE ON movie BEGIN
+        DELETE FROM movie_change WHERE movie_id = old.id;
+        INSERT INTO movie_change (movie_id, op) VALUES (old.id, 'delete');
+    END"""
+]
+
+# Cached result of a barcode lookup (positive or "not found")
+class BarcodeLookup(db.Model):
+    __tablename__ = 'barcode_cache'
+
+    barcode = db.Column(db.String(20), primary_key=True)
+    found = db.Column(db.Boolean, nullable=False, default=False)
+    result = db.Column(db.Text)  # JSON encoded movie info, NULL for misses
+    fetched_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def is_expired(self, now=None):
+        ttl = app.config['BARCODE_CACHE_TTL'] if self.found else app.config['BARCODE_CACHE_NEGATIVE_TTL']
+        return (now or datetime.utcnow()) - self.fetched_at > timedelta(seconds=ttl)
+
+# Bulk barcode import job and its per-barcode work items
+class ImportJob(db.Model):
+    __tablename__ = 'import_job'
+
+    id = db.Column(db.Integer, primary_key=True)
+    status = db.Column(db.String(20), nullable=False, default='queued', index=True)  # queued, running, completed, cancelled
+    location = db.Column(db.String(100))  # applied to every imported movie
+    condition = db.Column(db.String(20), default='Good')
+    total = db.Column(db.Integer, nullable=False, default=0)
+    found = db.Column(db.Integer, nullable=False, default=0)
+    not_found = db.Column(db.Integer, nullable=False, default=0)
+    failed = db.Column(db.Integer, nullable=False, default=0)
+    skipped = db.Column(db.Integer, nullable=False, default=0)  # duplicates of barcodes already in the collection
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        processed = self.found + self.not_found + self.failed + self.skipped
+        return {
+            'id': self.id,
+            'status': self.status,
+            'total': self.total,
+            'processed': processed,
+            'pending': self.total - processed,
+            'found': self.found,
+            'not_found': self.not_found,
+            'failed': self.failed,
+            'skipped': self.skipped,
+            'location': self.location,
+            'condition': self.condition,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+class ImportItem(db.Model):
+    __tablename__ = 'import_item'
+    __table_args__ = (
+        db.UniqueConstraint('job_id', 'barcode'),
+        db.Index('ix_import_item_job_status', 'job_id', 'status')
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.Integer, db.ForeignKey('import_job.id'), nullable=False)
+    barcode = db.Column(db.String(20), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, running, found, not_found, failed, skipped
+    claimed_at = db.Column(db.DateTime)
+    movie_id = db.Column(db.Integer)
+    title = db.Column(db.String(200))
+    source = db.Column(db.String(50))
+    error = db.Column(db.String(200))
+
+    def to_dict(self):
+        return {
+            'barcode': self.barcode,
+            'status': self.status,
+            'movie_id': self.movie_id,
+            'title': self.title,
+            'source': self.source,
+            'error': self.error
         }
 
+class MovieEnrichment(db.Model):
+    """TMDb enrichment state per movie, kept out of the movie table so claims
+    and attempts do not touch the search index or the change log"""
+    __tablename__ = 'movie_enrichment'
+
+    movie_id = db.Column(db.Integer, primary_key=True)
+    claimed_at = db.Column(db.DateTime)
+    enriched_at = db.Column(db.DateTime)  # last completed attempt
+    status = db.Column(db.String(20))  # updated, unchanged, not_found, failed
+    error = db.Column(db.String(200))
+
 # TMDb API configuration (get a free API key from https://www.themoviedb.org/settings/api)
 TMDB_API_KEY = os.environ.get('TMDB_API_KEY', 'your_api_key_here')
-TMDB_BASE_URL = 'https://api.themoviedb.org/3'
+TMDB_BASE_URL = os.environ.get('TMDB_BASE_URL', 'https://api.themoviedb.org/3')
 TMDB_IMAGE_BASE_URL = 'https://image.tmdb.org/t/p/w500'
 
-def decode_barcode(image_data):
-    """Decode barcode from image data"""
+# Poster URLs come from clients too; only these hosts are ever fetched to mirror them
+POSTER_SOURCE_HOSTS = {urlparse(TMDB_IMAGE_BASE_URL).hostname}
+
+# Barcode provider endpoints (overridable to point at a local stub, see benchmarks/)
+UPCITEMDB_BASE_URL = os.environ.get('UPCITEMDB_BASE_URL', 'https://api.upcitemdb.com')
+OPENFOODFACTS_BASE_URL = os.environ.get('OPENFOODFACTS_BASE_URL', 'https://world.openfoodfacts.org')
+BARCODE_LOOKUP_BASE_URL = os.environ.get('BARCODE_LOOKUP_BASE_URL', 'https://api.barcodelookup.com')
+
+# Prometheus metrics, exported on /metrics
+registry = metrics.Registry(prefix='movie_scanner_')
+REQUEST_SECONDS = registry.histogram('http_request_duration_seconds', 'HTTP request latency by route',
+                                     ['route', 'method', 'status'])
+DECODE_STAGE_SECONDS = registry.histogram('decode_stage_duration_seconds', 'Barcode decode time per pipeline stage',
+                                          ['stage'])
+PROVIDER_SECONDS = registry.histogram('provider_duration_seconds', 'Barcode provider call latency by outcome',
+                                      ['provider', 'outcome'])
+TMDB_SECONDS = registry.histogram('tmdb_request_duration_seconds', 'TMDb API request latency', ['endpoint'])
+BARCODE_CACHE_REQUESTS = registry.counter('barcode_cache_requests_total', 'Barcode lookup cache hits and misses',
+                                          ['result'])
+TITLE_INDEX_LOOKUPS = registry.counter('title_index_lookups_total', 'Titles resolved locally instead of by TMDb',
+                                       ['result'])
+
+def record_decode_stages(stages):
+    for stage in stages:
+        record_span(f"decode:{stage['stage']}", stage['ms'] / 1000, DECODE_STAGE_SECONDS, stage=stage['stage'])
+
+def record_tmdb_request(endpoint, seconds):
+    record_span(f"tmdb:{endpoint}", seconds, TMDB_SECONDS, endpoint=endpoint)
+
+# Request budgets shared by every lookup, in every worker process
+os.makedirs(os.path.dirname(os.path.abspath(app.config['PROVIDER_BUDGET_PATH'])), exist_ok=True)
+provider_buckets = {name: parse_rate_limit(limit, app.config['PROVIDER_BUDGET_PATH'], name)
+                    for name, limit in app.config['PROVIDER_RATE_LIMITS'].items()}
+
+# Shared TMDb client (pooled keep-alive session, retries, details cache)
+tmdb = TMDbClient(TMDB_API_KEY, base_url=TMDB_BASE_URL, rate_limiter=provider_buckets['TMDb'],
+                  on_request=record_tmdb_request)
+
+registry.callback('tmdb_cache_requests_total', 'TMDb movie details cache hits and misses', ['result'],
+                  lambda: {('hit',): tmdb.cache_hits, ('miss',): tmdb.cache_misses}, type='counter')
+
+def load_decoder():
+    """The barcode/vision stack (OpenCV, numpy, pyzbar), imported on first use.
+
+    Most requests never decode an image, so workers that only serve the
+    collection do not pay its start-up time and memory.
+    """
+    import decoder
+    return decoder
+
+def decode_barcode_bytes(image_bytes, max_dimension=None):
+    """Decode barcodes from encoded image bytes, returning (barcodes, stage timings)"""
+    try:
+        barcodes, stages = load_decoder().decode_bytes(image_bytes, max_dimension)
+        record_decode_stages(stages)
+        log.debug(f"Barcode decode stages: {stages}")
+        return barcodes, stages
+    
+    except Exception as e:
+        log.error(f"Barcode decode error: {e}")
+        return [], []
+
+def decode_barcode(image_data, max_dimension=None):
+    """Decode barcode from base64 image data (optionally a data: URL)"""
     try:
-        # Convert base64 to image
         if image_data.startswith('data:image'):
             image_data = image_data.split(',')[1]
         
         image_bytes = base64.b64decode(image_data)
-        image = Image.open(BytesIO(image_bytes))
-        
-        # Convert PIL image to OpenCV format
-        opencv_image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
-        
-        # Decode barcodes
-        barcodes = pyzbar.decode(opencv_image)
-        
-        results = []
-        for barcode in barcodes:
-            barcode_data = barcode.data.decode('utf-8')
-            barcode_type = barcode.type
-            results.append({
-                'data': barcode_data,
-                'type': barcode_type
-            })
-        
-        return results
+        return decode_barcode_bytes(image_bytes, max_dimension)
     
     except Exception as e:
-        print(f"Barcode decode error: {e}")
-        return []
+        log.error(f"Barcode decode error: {e}")
+        return [], []
 
-def clean_movie_title(title):
-    """Clean movie title by removing common DVD/Blu-ray indicators"""
-    if not title:
-        return title
-    
-    # Remove common format indicators
-    replacements = [
-        '[DVD]', '[Blu-ray]', '[4K]', '[Ultra HD]', '[UHD]',
-        '(DVD)', '(Blu-ray)', '(4K)', '(Ultra HD)', '(UHD)',
-        'DVD', 'Blu-ray', 'BluRay', '4K UHD', 'Ultra HD',
-        '- Special Edition', '- Director\'s Cut', '- Extended Edition',
-        'Special Edition', 'Director\'s Cut', 'Extended Edition',
-        '(Widescreen)', '(Full Screen)', 'Widescreen', 'Full Screen',
-        '- Collector\'s Edition', 'Collector\'s Edition', 'Deluxe Edition',
-        '[Region 1]', '[Region 2]', '[Region 4]', '(Region 1)', '(Region 2)', '(Region 4)'
-    ]
-    
-    cleaned_title = title
-    for replacement in replacements:
-        cleaned_title = cleaned_title.replace(replacement, '')
-    
-    # Remove extra whitespace and common separators
-    cleaned_title = cleaned_title.replace('  ', ' ').strip(' -,.')
-    
-    return cleaned_title
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp', '.tif', '.tiff')
 
-def detect_format_from_title(title):
-    """Detect movie format from product title"""
-    if not title:
-        return None
-    
-    title_lower = title.lower()
-    
-    if '4k' in title_lower or 'ultra hd' in title_lower or 'uhd' in title_lower:
-        return '4K Blu-ray'
-    elif 'blu-ray' in title_lower or 'blu ray' in title_lower or 'bluray' in title_lower:
-        return 'Blu-ray'
-    elif 'dvd' in title_lower:
-        return 'DVD'
-    
-    return None
+decode_pool = None
+
+def get_decode_pool():
+    """Process pool for CPU-bound batch decoding, started on first use"""
+    global decode_pool
+    if decode_pool is None:
+        # spawn rather than fork, so workers do not inherit this process's
+        # threads and locks. Under gunicorn or the flask CLI they only import
+        # decoder.py; started as `python app.py`, each worker also re-imports
+        # app.py as __mp_main__ (config and idle pools, no threads or jobs)
+        decode_pool = ProcessPoolExecutor(
+            max_workers=app.config['DECODE_WORKERS'],
+            mp_context=multiprocessing.get_context('spawn')
+        )
+    return decode_pool
+
+def scan_images_in_pool(images, max_dimension=None):
+    """Decode (name, image_bytes) pairs across the decode pool.
+
+    Yields one result dict per image as soon as it finishes. Only a small
+    window of images is in flight at once, so large folders or archives
+    are never held in memory as a whole. An error message in place of
+    the bytes is reported as that image's error.
+    """
+    pool = get_decode_pool()
+    decoder = load_decoder()
+    window = app.config['DECODE_WORKERS'] * 2
+    pending = set()
+
+    for name, image_bytes in images:
+        if isinstance(image_bytes, str):
+            yield {'image': name, 'barcodes': [], 'error': image_bytes}
+            continue
+        pending.add(pool.submit(decoder.decode_file, name, image_bytes, max_dimension))
+        if len(pending) >= window:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+    for future in as_completed(pending):
+        yield future.result()
+
+def iter_zip_images(file_obj, max_size, budget):
+    """Yield (name, bytes) for every image inside a zip archive.
+
+    Images over max_size uncompressed, or beyond budget['remaining'] bytes
+    (shared by every archive in a request), are yielded with an error
+    message instead of being decompressed.
+    """
+    with zipfile.ZipFile(file_obj) as archive:
+        for info in archive.infolist():
+            if info.is_dir() or not info.filename.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            if info.file_size > max_size:
+                yield info.filename, f"Image too large ({info.file_size} bytes uncompressed, limit {max_size})"
+                continue
+            if info.file_size > budget['remaining']:
+                yield info.filename, 'Archive too large: uncompressed size limit reached'
+                continue
+            # Read at most one byte past the limit, in case the header understates the size
+            with archive.open(info) as member:
+                image_bytes = member.read(max_size + 1)
+            if len(image_bytes) > max_size:
+                yield info.filename, f"Image too large (over {max_size} bytes uncompressed)"
+                continue
+            budget['remaining'] -= len(image_bytes)
+            yield info.filename, image_bytes
+
+def iter_directory_images(directory):
+    """Yield (path, bytes) for every image below a directory"""
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for filename in sorted(files):
+            if filename.lower().endswith(IMAGE_EXTENSIONS):
+                path = os.path.join(root, filename)
+                with open(path, 'rb') as image_file:
+                    yield path, image_file.read()
+
+class ProviderError(Exception):
+    """A provider call failed (timeout, server error, quota) rather than finding nothing"""
+
+    def __init__(self, message, quota=False, retry_after=None):
+        super().__init__(message)
+        self.quota = quota
+        self.retry_after = retry_after
+
+def check_provider_response(api_name, response):
+    """Raise ProviderError for quota and server-side failures"""
+    if response.status_code == 429:
+        retry_after = response.headers.get('Retry-After')
+        raise ProviderError(f"{api_name} quota exceeded", quota=True,
+                            retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None)
+    if response.status_code >= 500:
+        raise ProviderError(f"{api_name} server error {response.status_code}")
 
 def try_upcitemdb(barcode):
     """Try UPCitemdb.com API for barcode lookup"""
     try:
-        print(f"Trying UPCitemdb for barcode: {barcode}")
+        log.debug(f"Trying UPCitemdb for barcode: {barcode}")
         
-        upc_url = f"https://api.upcitemdb.com/prod/trial/lookup?upc={barcode}"
+        upc_url = f"{UPCITEMDB_BASE_URL}/prod/trial/lookup?upc={barcode}"
         headers = {
             'User-Agent': 'Mozilla/5.0 (compatible; MovieScanner/1.0)'
         }
         
         response = requests.get(upc_url, headers=headers, timeout=10)
-        print(f"UPCitemdb response status: {response.status_code}")
+        log.debug(f"UPCitemdb response status: {response.status_code}")
+        check_provider_response('UPCitemdb', response)
         
         if response.ok:
             data = response.json()
-            print(f"UPCitemdb response: {data}")
+            log.debug(f"UPCitemdb response: {data}")
             
             if data.get('items') and len(data['items']) > 0:
                 item = data['items'][0]
@@ -156,47 +583,52 @@ def try_upcitemdb(barcode):
                 description = item.get('description', '')
                 
                 # Try to extract movie title
-                movie_title = clean_movie_title(title)
+                movie_title = titles.clean_title(title)
                 
                 if not movie_title or len(movie_title) < 3:
-                    movie_title = clean_movie_title(description)
+                    movie_title = titles.clean_title(description)
                 
                 if movie_title and len(movie_title) >= 3:
-                    detected_format = detect_format_from_title(title) or detect_format_from_title(description)
-                    print(f"UPCitemdb found: {movie_title}, Format: {detected_format}")
+                    detected_format = titles.detect_format(title) or titles.detect_format(description)
+                    year = titles.release_year(title) or titles.release_year(description)
+                    log.debug(f"UPCitemdb found: {movie_title}, Format: {detected_format}, Year: {year}")
                     
                     return {
                         'title': movie_title,
                         'format_type': detected_format,
+                        'year': year,
                         'source': 'UPCitemdb'
                     }
         
-        print("UPCitemdb: No results found")
+        log.debug("UPCitemdb: No results found")
         return None
         
+    except ProviderError:
+        raise
     except requests.exceptions.Timeout:
-        print("UPCitemdb: Request timeout")
-        return None
+        log.warning("UPCitemdb: Request timeout")
+        raise ProviderError("UPCitemdb request timeout")
     except requests.exceptions.RequestException as e:
-        print(f"UPCitemdb request error: {e}")
-        return None
+        log.warning(f"UPCitemdb request error: {e}")
+        raise ProviderError(f"UPCitemdb request error: {e}")
     except Exception as e:
-        print(f"UPCitemdb error: {e}")
-        return None
+        log.error(f"UPCitemdb error: {e}")
+        raise ProviderError(f"UPCitemdb error: {e}")
 
 def try_openfoodfacts(barcode):
     """Try Open Food Facts API for barcode lookup"""
     try:
-        print(f"Trying Open Food Facts for barcode: {barcode}")
+        log.debug(f"Trying Open Food Facts for barcode: {barcode}")
         
         # Open Food Facts API endpoint
-        off_url = f"https://world.openfoodfacts.org/api/v0/product/{barcode}.json"
+        off_url = f"{OPENFOODFACTS_BASE_URL}/api/v0/product/{barcode}.json"
         headers = {
             'User-Agent': 'MovieScanner/1.0 (https://yourapp.com)'
         }
         
         response = requests.get(off_url, headers=headers, timeout=10)
-        print(f"Open Food Facts response status: {response.status_code}")
+        log.debug(f"Open Food Facts response status: {response.status_code}")
+        check_provider_response('Open Food Facts', response)
         
         if response.ok:
             data = response.json()
@@ -212,7 +644,7 @@ def try_openfoodfacts(barcode):
                 brands = product.get('brands', '')
                 categories = product.get('categories', '')
                 
-                print(f"Open Food Facts product: {title}, Brands: {brands}, Categories: {categories}")
+                log.debug(f"Open Food Facts product: {title}, Brands: {brands}, Categories: {categories}")
                 
                 # Check if this might be a movie/media product
                 # Open Food Facts sometimes has entertainment products
@@ -222,48 +654,52 @@ def try_openfoodfacts(barcode):
                 is_media = any(indicator in full_text for indicator in media_indicators)
                 
                 if is_media and title:
-                    movie_title = clean_movie_title(title)
+                    movie_title = titles.clean_title(title)
                     
                     if movie_title and len(movie_title) >= 3:
-                        detected_format = detect_format_from_title(full_text)
-                        print(f"Open Food Facts found media: {movie_title}, Format: {detected_format}")
+                        detected_format = titles.detect_format(full_text)
+                        log.debug(f"Open Food Facts found media: {movie_title}, Format: {detected_format}")
                         
                         return {
                             'title': movie_title,
                             'format_type': detected_format,
+                            'year': titles.release_year(title),
                             'source': 'Open Food Facts'
                         }
         
-        print("Open Food Facts: No media product found")
+        log.debug("Open Food Facts: No media product found")
         return None
         
+    except ProviderError:
+        raise
     except requests.exceptions.Timeout:
-        print("Open Food Facts: Request timeout")
-        return None
+        log.warning("Open Food Facts: Request timeout")
+        raise ProviderError("Open Food Facts request timeout")
     except requests.exceptions.RequestException as e:
-        print(f"Open Food Facts request error: {e}")
-        return None
+        log.warning(f"Open Food Facts request error: {e}")
+        raise ProviderError(f"Open Food Facts request error: {e}")
     except Exception as e:
-        print(f"Open Food Facts error: {e}")
-        return None
+        log.error(f"Open Food Facts error: {e}")
+        raise ProviderError(f"Open Food Facts error: {e}")
 
 def try_barcode_lookup_api(barcode):
     """Try Barcode Lookup API as additional fallback"""
     try:
-        print(f"Trying Barcode Lookup API for barcode: {barcode}")
+        log.debug(f"Trying Barcode Lookup API for barcode: {barcode}")
         
         # Note: This API requires registration and API key
         # Get free API key from https://www.barcodelookup.com/api
         api_key = os.environ.get('BARCODE_LOOKUP_API_KEY')
         
         if not api_key:
-            print("Barcode Lookup API: No API key provided")
+            log.debug("Barcode Lookup API: No API key provided")
             return None
         
-        lookup_url = f"https://api.barcodelookup.com/v3/products?barcode={barcode}&formatted=y&key={api_key}"
+        lookup_url = f"{BARCODE_LOOKUP_BASE_URL}/v3/products?barcode={barcode}&formatted=y&key={api_key}"
         
         response = requests.get(lookup_url, timeout=10)
-        print(f"Barcode Lookup API response status: {response.status_code}")
+        log.debug(f"Barcode Lookup API response status: {response.status_code}")
+        check_provider_response('Barcode Lookup API', response)
         
         if response.ok:
             data = response.json()
@@ -274,7 +710,7 @@ def try_barcode_lookup_api(barcode):
                 description = product.get('description', '')
                 category = product.get('category', '')
                 
-                print(f"Barcode Lookup API product: {title}, Category: {category}")
+                log.debug(f"Barcode Lookup API product: {title}, Category: {category}")
                 
                 # Check if it's a movie/media product
                 full_text = f"{title} {description} {category}".lower()
@@ -282,55 +718,320 @@ def try_barcode_lookup_api(barcode):
                 is_media = any(indicator in full_text for indicator in media_indicators)
                 
                 if is_media and title:
-                    movie_title = clean_movie_title(title)
+                    movie_title = titles.clean_title(title)
                     
                     if movie_title and len(movie_title) >= 3:
-                        detected_format = detect_format_from_title(full_text)
-                        print(f"Barcode Lookup API found media: {movie_title}, Format: {detected_format}")
+                        detected_format = titles.detect_format(full_text)
+                        log.debug(f"Barcode Lookup API found media: {movie_title}, Format: {detected_format}")
                         
                         return {
                             'title': movie_title,
                             'format_type': detected_format,
+                            'year': titles.release_year(title) or titles.release_year(description),
                             'source': 'Barcode Lookup API'
                         }
         
-        print("Barcode Lookup API: No media product found")
+        log.debug("Barcode Lookup API: No media product found")
         return None
         
+    except ProviderError:
+        raise
     except requests.exceptions.Timeout:
-        print("Barcode Lookup API: Request timeout")
-        return None
+        log.warning("Barcode Lookup API: Request timeout")
+        raise ProviderError("Barcode Lookup API request timeout")
     except requests.exceptions.RequestException as e:
-        print(f"Barcode Lookup API request error: {e}")
-        return None
+        log.warning(f"Barcode Lookup API request error: {e}")
+        raise ProviderError(f"Barcode Lookup API request error: {e}")
     except Exception as e:
-        print(f"Barcode Lookup API error: {e}")
+        log.error(f"Barcode Lookup API error: {e}")
+        raise ProviderError(f"Barcode Lookup API error: {e}")
+
+upc_catalogue = catalogue.UpcCatalogue(app.config['UPC_CATALOGUE_PATH'])
+
+def try_upc_catalogue(barcode):
+    """Look the barcode up in the offline catalogue (no network)"""
+    try:
+        product = upc_catalogue.lookup(barcode)
+        if product:
+            log.debug(f"UPC catalogue found: {product['title']}, Format: {product['format_type']}")
+            return dict(product, source='UPC catalogue')
         return None
+    except Exception as e:
+        raise ProviderError(f"UPC catalogue error: {e}")
+
+# Local providers, tried in order before any network provider is called
+LOCAL_BARCODE_PROVIDERS = [
+    ('UPC catalogue', try_upc_catalogue)
+]
+
+# Barcode providers in order of reliability/speed (earlier wins ties)
+BARCODE_PROVIDERS = [
+    ('UPCitemdb', try_upcitemdb),
+    ('Open Food Facts', try_openfoodfacts),
+    ('Barcode Lookup API', try_barcode_lookup_api)
+]
+
+# Rolling latency/hit statistics and a circuit breaker per provider
+provider_stats = {
+    api_name: ProviderStats(
+        api_name,
+        window=app.config['PROVIDER_STATS_WINDOW'],
+        breaker=CircuitBreaker(app.config['PROVIDER_BREAKER_FAILURES'], app.config['PROVIDER_BREAKER_COOLDOWN'])
+    )
+    for api_name, api_function in LOCAL_BARCODE_PROVIDERS + BARCODE_PROVIDERS
+}
+
+registry.callback('provider_circuit_open', 'Whether a provider is currently skipped by its circuit breaker',
+                  ['provider'], lambda: {(name,): int(stats.breaker.state == 'open')
+                                         for name, stats in provider_stats.items()})
+
+def order_providers(providers):
+    """Order providers by live statistics, returning (primary, fallback).
+
+    Best expected hits per second of latency first; the static order
+    breaks ties. Providers that have had enough calls to judge but
+    hardly ever return a product go to the fallback list, which is only
+    tried once every primary provider has missed.
+    """
+    ranked = sorted(enumerate(providers), key=lambda entry: (-provider_stats[entry[1][0]].score(), entry[0]))
+
+    primary, fallback = [], []
+    for index, provider in ranked:
+        summary = provider_stats[provider[0]].summary()
+        rarely_hits = (summary['calls'] >= app.config['PROVIDER_FALLBACK_MIN_CALLS']
+                       and (summary['hit_rate'] or 0) < app.config['PROVIDER_FALLBACK_HIT_RATE'])
+        (fallback if rarely_hits else primary).append(provider)
+    return primary, fallback
+
+def provider_retry_after(api_name):
+    """Seconds until a skipped provider can be called again"""
+    bucket = provider_buckets.get(api_name)
+    breaker = provider_stats[api_name].breaker if api_name in provider_stats else None
+    return max(bucket.wait_time() if bucket else 0, breaker.retry_after() if breaker else 0)
+
+# Shared pool for concurrent provider fan-out
+lookup_executor = ThreadPoolExecutor(
+    max_workers=app.config['BARCODE_LOOKUP_WORKERS'],
+    thread_name_prefix='barcode-lookup'
+)
+
+# Import jobs fan out on their own pool, so lookups waiting for provider
+# tokens never hold up interactive scans
+import_lookup_executor = ThreadPoolExecutor(
+    max_workers=app.config['IMPORT_WORKERS'] * len(BARCODE_PROVIDERS),
+    thread_name_prefix='import-lookup'
+)
+
+class ProviderSkipped(Exception):
+    """A provider was not called: its request budget is used up or its circuit is open"""
+
+class ProviderBudgetExceeded(Exception):
+    """Nothing was found and at least one provider was skipped (budget or open circuit)"""
+
+    def __init__(self, providers, retry_after):
+        super().__init__(f"Request budget exhausted or provider unavailable: {', '.join(providers)}")
+        self.providers = providers
+        self.retry_after = retry_after
+
+def call_provider(api_name, api_function, barcode, rate_wait=0):
+    """Call a provider if its circuit and token bucket allow it, or raise ProviderSkipped.
+
+    The outcome and latency feed the provider's statistics; failures are
+    counted against the circuit breaker and raised as ProviderError, so
+    callers can tell them apart from a miss (None).
+    """
+    stats = provider_stats.get(api_name)
+    if stats is not None and not stats.breaker.allow():
+        log.warning(f"{api_name}: circuit open, skipping")
+        raise ProviderSkipped(api_name)
+
+    bucket = provider_buckets.get(api_name)
+    if bucket is not None and not bucket.acquire(timeout=rate_wait):
+        log.warning(f"{api_name}: request budget exhausted, skipping")
+        if stats is not None:
+            stats.breaker.release()
+        raise ProviderSkipped(api_name)
+
+    started = time.monotonic()
+    try:
+        product_info = api_function(barcode)
+    except Exception as e:
+        quota = isinstance(e, ProviderError) and e.quota
+        outcome = 'quota' if quota else 'error'
+        elapsed = time.monotonic() - started
+        record_span(f"provider:{api_name}", elapsed, PROVIDER_SECONDS, provider=api_name, outcome=outcome)
+        if stats is not None:
+            stats.record(elapsed, outcome, e)
+            stats.breaker.record_failure(
+                retry_after=(e.retry_after or app.config['PROVIDER_BREAKER_COOLDOWN']) if quota else None
+            )
+        if isinstance(e, ProviderError):
+            raise
+        raise ProviderError(f"{api_name} error: {e}") from e
 
-def search_movie_by_barcode(barcode):
-    """Search for movie information using multiple barcode databases with fallbacks"""
+    outcome = 'hit' if is_valid_product(product_info) else 'miss'
+    elapsed = time.monotonic() - started
+    record_span(f"provider:{api_name}", elapsed, PROVIDER_SECONDS, provider=api_name, outcome=outcome)
+    if stats is not None:
+        stats.record(elapsed, outcome)
+        stats.breaker.record_success()
+    return product_info
+
+def is_valid_product(product_info):
+    """Check a provider result passes the same title checks the providers use"""
+    if not product_info or not product_info.get('title'):
+        return False
+    return len(product_info['title']) >= 3
+
+def iter_products_sequential(barcode, providers, rate_wait=0, skipped=None, failed=None):
+    """Ask each provider in turn, yielding (api_name, product_info).
+
+    Providers that were not called are added to skipped, providers whose
+    call failed to failed.
+    """
+    for api_name, api_function in providers:
+        log.debug(f"Trying {api_name}...")
+        try:
+            yield api_name, call_provider(api_name, api_function, barcode, rate_wait)
+        except ProviderSkipped:
+            if skipped is not None:
+                skipped.append(api_name)
+        except ProviderError as e:
+            log.warning(f"{api_name} failed: {e}")
+            if failed is not None:
+                failed.append(api_name)
+
+def iter_products_parallel(barcode, providers, deadline, grace, rate_wait=0, skipped=None, failed=None,
+                           executor=None):
+    """Ask every provider at once, yielding valid (api_name, product_info) results.
+
+    A result is only handed out once every higher-priority provider has
+    answered, or the grace window (measured from the first valid answer)
+    has run out, so priority still decides between near-simultaneous hits.
+    Nothing is waited on past the overall deadline; stragglers are ignored
+    and reported as failed (timed out). Later yields are fallbacks for when
+    the TMDb search on a title fails. skipped and failed collect providers
+    as in iter_products_sequential.
+    """
+    started = time.monotonic()
+    deadline_at = started + deadline
+    grace_at = None
+    executor = executor or lookup_executor
+
+    # Waiting for a token must leave time for the call itself, or the
+    # provider is abandoned at the deadline however long it waited
+    rate_wait = min(rate_wait, deadline / 2)
+
+    # Each call runs in a copy of this context so its spans reach the request trace
+    futures = {executor.submit(contextvars.copy_context().run, call_provider,
+                               api_name, api_function, barcode, rate_wait): index
+               for index, (api_name, api_function) in enumerate(providers)}
+    pending = set(futures)
+    results = {}
+    yielded = set()
+
+    try:
+        while True:
+            now = time.monotonic()
+            ready = [index for index, info in results.items()
+                     if index not in yielded and is_valid_product(info)]
+            best = min(ready) if ready else None
+
+            if best is not None:
+                higher_pending = any(futures[future] < best for future in pending)
+                if not higher_pending or now >= grace_at or now >= deadline_at:
+                    yielded.add(best)
+                    log.debug(f"Using {providers[best][0]} result after {now - started:.2f}s")
+                    yield providers[best][0], results[best]
+                    continue
+                timeout = min(grace_at, deadline_at) - now
+            else:
+                if not pending or now >= deadline_at:
+                    break
+                timeout = deadline_at - now
+
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = futures[future]
+                try:
+                    results[index] = future.result()
+                except ProviderSkipped:
+                    if skipped is not None:
+                        skipped.append(providers[index][0])
+                    results[index] = None
+                except Exception as e:
+                    log.warning(f"{providers[index][0]} failed: {e}")
+                    if failed is not None:
+                        failed.append(providers[index][0])
+                    results[index] = None
+
+                if grace_at is None and is_valid_product(results[index]):
+                    grace_at = time.monotonic() + grace
+
+        if pending:
+            log.warning(f"Ignoring {len(pending)} provider(s) still running after {time.monotonic() - started:.2f}s")
+            if failed is not None:
+                failed.extend(providers[futures[future]][0] for future in pending)
+    finally:
+        for future in pending:
+            future.cancel()
+
+def search_movie_by_barcode(barcode, mode=None, rate_wait=0, executor=None):
+    """Search for movie information using multiple barcode databases with fallbacks.
+
+    Providers (and TMDb) without request budget left are skipped (after
+    waiting up to rate_wait seconds for a token). If that leaves the
+    barcode unresolved, ProviderBudgetExceeded is raised instead of
+    returning None, so the miss is not mistaken for (or cached as) a
+    genuine "not found". Likewise ProviderError is raised when a provider
+    or TMDb failed or was still running at the fan-out deadline: None
+    means every source really had nothing. executor overrides the pool used for
+    the parallel fan-out.
+    """
+    skipped, failed = [], []
+    # Imports may wait longer for TMDb tokens; interactive scans give up after TMDB_RATE_WAIT
+    tmdb_wait = max(rate_wait, app.config['TMDB_RATE_WAIT'])
     try:
-        print(f"Starting barcode lookup for: {barcode}")
+        log.debug(f"Starting barcode lookup for: {barcode}")
         
-        # Try each API in order of reliability/speed
-        apis_to_try = [
-            ('UPCitemdb', try_upcitemdb),
-            ('Open Food Facts', try_openfoodfacts),
-            ('Barcode Lookup API', try_barcode_lookup_api)
-        ]
+        mode = mode or app.config['BARCODE_LOOKUP_MODE']
+        providers, fallback_providers = order_providers(BARCODE_PROVIDERS)
+        if mode == 'parallel':
+            network_candidates = iter_products_parallel(
+                barcode, providers,
+                deadline=app.config['BARCODE_LOOKUP_DEADLINE'],
+                grace=app.config['BARCODE_LOOKUP_GRACE'],
+                rate_wait=rate_wait, skipped=skipped, failed=failed, executor=executor
+            )
+        else:
+            network_candidates = iter_products_sequential(barcode, providers, rate_wait=rate_wait,
+                                                          skipped=skipped, failed=failed)
+
+        # All iterators are lazy: network providers only start if the local ones miss,
+        # and rarely-useful providers only if every other provider missed
+        candidates = itertools.chain(
+            iter_products_sequential(barcode, LOCAL_BARCODE_PROVIDERS, failed=failed),
+            network_candidates,
+            iter_products_sequential(barcode, fallback_providers, rate_wait=rate_wait, skipped=skipped, failed=failed)
+        )
         
-        for api_name, api_function in apis_to_try:
-            print(f"Trying {api_name}...")
-            
-            # Get basic product info from barcode API
-            product_info = api_function(barcode)
-            
-            if product_info and product_info.get('title'):
+        for api_name, product_info in candidates:
+            if is_valid_product(product_info):
                 movie_title = product_info['title']
-                print(f"{api_name} found title: {movie_title}")
+                log.debug(f"{api_name} found title: {movie_title}")
                 
                 # Search TMDb for complete movie details
-                movie_info = search_movie_by_title(movie_title)
+                try:
+                    movie_info = lookup_movie_title(movie_title, product_info.get('year'),
+                                                    product_info.get('tmdb_id'), rate_wait=tmdb_wait)
+                except TMDbRateLimited as e:
+                    log.warning(f"TMDb search skipped for {movie_title}: {e}")
+                    skipped.append('TMDb')
+                    continue
+                except requests.exceptions.RequestException as e:
+                    log.warning(f"TMDb search failed for {movie_title}: {e}")
+                    failed.append('TMDb')
+                    continue
                 
                 if movie_info:
                     # Add the detected format and barcode info
@@ -340,217 +1041,1864 @@ def search_movie_by_barcode(barcode):
                     movie_info['barcode'] = barcode
                     movie_info['lookup_source'] = product_info.get('source', api_name)
                     
-                    print(f"Successfully found movie via {api_name}: {movie_info['title']}")
+                    log.info(f"Successfully found movie via {api_name}: {movie_info['title']}")
                     return movie_info
                 else:
-                    print(f"{api_name} found product but TMDb search failed for: {movie_title}")
+                    log.warning(f"{api_name} found product but TMDb has no match for: {movie_title}")
             else:
-                print(f"{api_name} found no relevant product")
+                log.debug(f"{api_name} found no relevant product")
+        
+        if skipped:
+            retry_after = min(provider_retry_after(name) for name in skipped)
+            raise ProviderBudgetExceeded(skipped, retry_after)
+        if failed:
+            raise ProviderError(f"Lookup incomplete, failed or timed out: {', '.join(dict.fromkeys(failed))}")
         
-        print("All barcode lookup APIs failed")
+        log.info("No barcode lookup API found this barcode")
         return None
         
+    except (ProviderBudgetExceeded, ProviderError):
+        raise
+    except Exception as e:
+        log.error(f"Barcode lookup error: {e}")
+        raise ProviderError(f"Barcode lookup error: {e}") from e
+
+def tmdb_movie_info(movie, details_data):
+    """Movie fields from a TMDb search result (or details) and its details with credits"""
+    credits_data = details_data.get('credits') or {}
+
+    # Extract director from crew
+    director = None
+    if credits_data.get('crew'):
+        for crew_member in credits_data['crew']:
+            if crew_member.get('job') == 'Director':
+                director = crew_member.get('name')
+                break
+
+    # Format genres
+    genres = []
+    if details_data.get('genres'):
+        genres = [genre['name'] for genre in details_data['genres']]
+
+    # Parse release year
+    release_date = movie.get('release_date', '') or details_data.get('release_date', '')
+    year = None
+    if release_date and len(release_date) >= 4:
+        try:
+            year = int(release_date[:4])
+        except ValueError:
+            pass
+
+    # Build poster URL
+    poster_url = None
+    if movie.get('poster_path'):
+        poster_url = f"{TMDB_IMAGE_BASE_URL}{movie['poster_path']}"
+
+    return {
+        'title': movie.get('title'),
+        'year': year,
+        'director': director,
+        'genre': ', '.join(genres) if genres else None,
+        'tmdb_id': str(movie.get('id')),
+        'poster_url': poster_url
+    }
+
+# Known films by title: collection movies linked to TMDb, kept current from
+# the change log, plus recent TMDb results (bounded)
+title_index = titles.TitleIndex(threshold=app.config['TITLE_MATCH_THRESHOLD'])
+title_index_lock = threading.Lock()
+title_index_state = {'seq': 0, 'seeded': False}
+TITLE_INFO_FIELDS = ('title', 'year', 'director', 'genre', 'tmdb_id', 'poster_url')
+
+def sync_title_index():
+    """Apply collection changes since the last sync (everything, the first time)"""
+    with title_index_lock:
+        latest = db.session.query(func.max(MovieChange.seq)).scalar() or 0
+        if latest < title_index_state['seq']:
+            # The change log started over (database replaced); rebuild
+            title_index.clear()
+            title_index_state.update(seq=0, seeded=False)
+
+        if not title_index_state['seeded']:
+            # Movies found by earlier barcode lookups, most recent first
+            cached = BarcodeLookup.query.filter_by(found=True).order_by(BarcodeLookup.fetched_at.desc()) \
+                .limit(title_index.max_bounded)
+            for entry in reversed(cached.all()):
+                remember_tmdb_result(json.loads(entry.result))
+            title_index_state['seeded'] = True
+
+        columns = [getattr(Movie, field) for field in TITLE_INFO_FIELDS]
+        while title_index_state['seq'] < latest:
+            rows = db.session.query(MovieChange.seq, MovieChange.movie_id, MovieChange.op, *columns) \
+                .outerjoin(Movie, Movie.id == MovieChange.movie_id) \
+                .filter(MovieChange.seq > title_index_state['seq']) \
+                .order_by(MovieChange.seq).limit(2000).all()
+            if not rows:
+                break
+            for row in rows:
+                if row.op == 'delete' or not row.tmdb_id or not row.title:
+                    title_index.remove(('movie', row.movie_id))
+                else:
+                    info = {field: getattr(row, field) for field in TITLE_INFO_FIELDS}
+                    title_index.add(('movie', row.movie_id), row.title, row.year, row.tmdb_id, info)
+            title_index_state['seq'] = rows[-1].seq
+
+def remember_tmdb_result(movie_info):
+    if movie_info and movie_info.get('tmdb_id') and movie_info.get('title'):
+        info = {field: movie_info.get(field) for field in TITLE_INFO_FIELDS}
+        title_index.add(('tmdb', info['tmdb_id']), info['title'], info['year'], info['tmdb_id'], info, bounded=True)
+
+def find_known_movie(title, year=None, tmdb_id=None):
+    """Movie info for a title we already know well enough to skip TMDb, or None.
+
+    A title alone is never enough (remakes share titles), so this needs the
+    release year or the TMDb id from the product to agree as well.
+    """
+    if not app.config['LOCAL_TITLE_MATCH'] or not (year or tmdb_id):
+        return None
+    try:
+        with span('title_index'):
+            sync_title_index()
+            match = title_index.lookup(title, year, group=str(tmdb_id) if tmdb_id else None)
     except Exception as e:
-        print(f"Barcode lookup error: {e}")
+        log.warning(f"Local title match error: {e}")
+        return None
+
+    TITLE_INDEX_LOOKUPS.inc(result='hit' if match else 'miss')
+    if match is None:
+        return None
+    movie_info, score = match
+    log.debug(f"Matched '{title}' locally to '{movie_info['title']}' ({score})")
+    return dict(movie_info)
+
+def lookup_movie_title(title, year=None, tmdb_id=None, local=True, rate_wait=None):
+    """Movie info for a title (known locally or from TMDb), or None if TMDb has no match.
+
+    TMDb search errors are raised, so callers can tell them from a miss,
+    and so is TMDbRateLimited when no request token comes within rate_wait
+    seconds. local=False always asks TMDb.
+    """
+    known = find_known_movie(title, year, tmdb_id) if local else None
+    if known:
+        return known
+
+    log.debug(f"Searching TMDb for: {title}")
+
+    # Search for movies by title
+    results = tmdb.search(title, year, rate_wait=rate_wait)
+    if not results and year:
+        # Release years on product listings are sometimes off (regional or re-release dates)
+        results = tmdb.search(title, rate_wait=rate_wait)
+    if not results:
         return None
 
-def search_movie_by_title(title):
-    """Search for movie information using TMDb API"""
+    movie = results[0]  # Get the first/best match
+
+    # Get additional details including director (credits come in the same request)
+    movie_id = movie.get('id')
     try:
-        print(f"Searching TMDb for: {title}")
-        
-        # Search for movies by title
-        search_url = f"{TMDB_BASE_URL}/search/movie"
-        params = {
-            'api_key': TMDB_API_KEY,
-            'query': title,
-            'language': 'en-US'
-        }
+        details_data = tmdb.get_movie(movie_id, rate_wait=rate_wait)
+    except requests.exceptions.RequestException as e:
+        log.warning(f"TMDb details error for {movie_id}: {e}")
+        details_data = {}
 
-        response = requests.get(search_url, params=params, timeout=10)
-        data = response.json()
+    movie_info = tmdb_movie_info(movie, details_data)
+    remember_tmdb_result(movie_info)
+    return movie_info
 
-        if data.get('results') and len(data['results']) > 0:
-            movie = data['results'][0]  # Get the first/best match
-            
-            # Get additional details including director
-            movie_id = movie.get('id')
-            details_url = f"{TMDB_BASE_URL}/movie/{movie_id}"
-            credits_url = f"{TMDB_BASE_URL}/movie/{movie_id}/credits"
-            
-            details_params = {'api_key': TMDB_API_KEY, 'language': 'en-US'}
-            
-            details_response = requests.get(details_url, params=details_params, timeout=10)
-            credits_response = requests.get(credits_url, params=details_params, timeout=10)
-            
-            details_data = details_response.json() if details_response.ok else {}
-            credits_data = credits_response.json() if credits_response.ok else {}
-
-            # Extract director from crew
-            director = None
-            if credits_data.get('crew'):
-                for crew_member in credits_data['crew']:
-                    if crew_member.get('job') == 'Director':
-                        director = crew_member.get('name')
-                        break
-
-            # Format genres
-            genres = []
-            if details_data.get('genres'):
-                genres = [genre['name'] for genre in details_data['genres']]
-
-            # Parse release year
-            release_date = movie.get('release_date', '') or details_data.get('release_date', '')
-            year = None
-            if release_date and len(release_date) >= 4:
-                try:
-                    year = int(release_date[:4])
-                except ValueError:
-                    pass
-
-            # Build poster URL
-            poster_url = None
-            if movie.get('poster_path'):
-                poster_url = f"{TMDB_IMAGE_BASE_URL}{movie['poster_path']}"
-
-            return {
-                'title': movie.get('title'),
-                'year': year,
-                'director': director,
-                'genre': ', '.join(genres) if genres else None,
-                'tmdb_id': str(movie_id),
-                'poster_url': poster_url
-            }
+def search_movie_by_title(title, year=None):
+    """Search for movie information using TMDb API.
 
+    Raises ProviderBudgetExceeded when TMDb's request budget stays empty
+    for TMDB_RATE_WAIT seconds.
+    """
+    try:
+        return lookup_movie_title(title, year, local=False, rate_wait=app.config['TMDB_RATE_WAIT'])
+    except TMDbRateLimited as e:
+        raise ProviderBudgetExceeded(['TMDb'], e.retry_after)
     except requests.exceptions.Timeout:
-        print("TMDb API timeout")
+        log.warning("TMDb API timeout")
         return None
     except requests.exceptions.RequestException as e:
-        print(f"TMDb API request error: {e}")
+        log.warning(f"TMDb API request error: {e}")
         return None
     except Exception as e:
-        print(f"Movie search error: {e}")
+        log.error(f"Movie search error: {e}")
         return None
 
-@app.route('/')
-def index():
-    return render_template('index.html')
+def get_cached_lookup(barcode):
+    """Return the cache entry for a barcode, or None if missing/expired"""
+    entry = db.session.get(BarcodeLookup, barcode)
+    if entry is None:
+        return None
 
-@app.route('/scan')
-def scan():
-    return render_template('scan.html')
+    if entry.is_expired():
+        db.session.delete(entry)
+        db.session.commit()
+        return None
 
-@app.route('/collection')
-def collection():
-    movies = Movie.query.order_by(Movie.added_date.desc()).all()
-    return render_template('collection.html', movies=movies)
+    return entry
 
-@app.route('/api/scan_barcode', methods=['POST'])
-def scan_barcode():
+def store_cached_lookup(barcode, movie_info):
+    """Store a lookup result (movie_info may be None for a miss)"""
     try:
-        data = request.get_json()
-        image_data = data.get('image')
-        
-        if not image_data:
-            return jsonify({'error': 'No image data provided'}), 400
+        entry = db.session.get(BarcodeLookup, barcode) or BarcodeLookup(barcode=barcode)
+        entry.found = movie_info is not None
+        entry.result = json.dumps(movie_info) if movie_info is not None else None
+        entry.fetched_at = datetime.utcnow()
+        db.session.add(entry)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        log.error(f"Barcode cache write error: {e}")
 
-        # Decode barcode
-        barcodes = decode_barcode(image_data)
-        
-        if not barcodes:
-            return jsonify({'error': 'No barcode found in image'}), 400
+def invalidate_cached_lookup(barcode):
+    """Drop a single barcode from the lookup cache"""
+    deleted = BarcodeLookup.query.filter_by(barcode=barcode).delete()
+    db.session.commit()
+    return deleted
 
-        return jsonify({
-            'success': True,
-            'barcodes': barcodes
-        })
+def clear_lookup_cache():
+    """Drop every entry from the lookup cache"""
+    deleted = BarcodeLookup.query.delete()
+    db.session.commit()
+    return deleted
 
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+def lookup_movie_by_barcode(barcode, refresh=False, rate_wait=0, executor=None):
+    """Cached wrapper around search_movie_by_barcode.
 
-@app.route('/api/search_movie_barcode', methods=['POST'])
-def search_movie_barcode():
-    """Endpoint for barcode-based movie searches with multiple API fallbacks"""
-    try:
-        data = request.get_json()
-        barcode = data.get('barcode')
-        
-        if not barcode:
-            return jsonify({'error': 'No barcode provided'}), 400
+    Returns a (movie_info, cache_hit) tuple. movie_info is None when the
+    barcode could not be resolved (either now or by a cached miss).
+    ProviderBudgetExceeded and ProviderError propagate and nothing is
+    cached in that case.
+    """
+    if not refresh:
+        with span('barcode_cache'):
+            entry = get_cached_lookup(barcode)
+        if entry is not None:
+            BARCODE_CACHE_REQUESTS.inc(result='hit')
+            log.debug(f"Barcode cache hit for {barcode} (found={entry.found})")
+            return (json.loads(entry.result) if entry.found else None), True
+        BARCODE_CACHE_REQUESTS.inc(result='miss')
+    else:
+        BARCODE_CACHE_REQUESTS.inc(result='refresh')
 
-        movie_info = search_movie_by_barcode(barcode)
-        
-        if movie_info:
-            return jsonify({
-                'success': True,
-                'movie': movie_info
-            })
-        else:
-            return jsonify({
-                'success': False,
-                'error': 'Movie not found for this barcode',
-                'barcode': barcode
-            })
-            
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    movie_info = search_movie_by_barcode(barcode, rate_wait=rate_wait, executor=executor)
+    store_cached_lookup(barcode, movie_info)
+    return movie_info, False
 
-@app.route('/api/search_movie', methods=['POST'])
-def search_movie():
-    try:
-        data = request.get_json()
-        title = data.get('title')
-        
-        if not title:
-            return jsonify({'error': 'No title provided'}), 400
+# Local poster mirror. New or changed poster URLs are picked up from every
+# commit, whatever route or job wrote them, and mirrored in the background.
+poster_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='posters')
 
-        movie_info = search_movie_by_title(title)
-        
-        if movie_info:
-            return jsonify({
-                'success': True,
-                'movie': movie_info
-            })
-        else:
-            return jsonify({'error': 'Movie not found'}), 404
+@event.listens_for(Movie.poster_url, 'set')
+def reset_poster_key(movie, value, oldvalue, initiator):
+    # The mirrored files belong to the old URL; stop serving them until the new one is mirrored
+    if value != oldvalue:
+        movie.poster_key = None
 
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+@event.listens_for(Session, 'after_flush')
+def collect_poster_changes(session, flush_context):
+    changed = session.info.setdefault('poster_changes', set())
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Movie) and obj.poster_url and inspect(obj).attrs.poster_url.history.has_changes():
+            changed.add(obj.id)
 
-@app.route('/api/add_movie', methods=['POST'])
-def add_movie():
+@event.listens_for(Session, 'after_commit')
+def queue_poster_changes(session):
+    changed = session.info.pop('poster_changes', None)
+    if changed:
+        poster_executor.submit(mirror_movie_posters, sorted(changed))
+
+@event.listens_for(Session, 'after_rollback')
+def discard_poster_changes(session):
+    session.info.pop('poster_changes', None)
+
+def mirror_movie_posters(movie_ids, force=False):
+    """Mirror posters for the given movies; returns the number mirrored"""
+    mirrored = 0
+    with app.app_context():
+        for movie in Movie.query.filter(Movie.id.in_(movie_ids)).all():
+            if not movie.poster_url or (movie.poster_key == posters.poster_key(movie.poster_url) and not force):
+                continue
+            if not posters.is_allowed_source(movie.poster_url, POSTER_SOURCE_HOSTS):
+                log.warning(f"Not mirroring poster for movie {movie.id}: {movie.poster_url} is not a TMDb image")
+                continue
+            try:
+                movie.poster_key = posters.mirror_poster(movie.poster_url, app.config['POSTER_FOLDER'],
+                                                         session=tmdb.session, force=force,
+                                                         allowed_hosts=POSTER_SOURCE_HOSTS)
+                db.session.commit()
+                mirrored += 1
+            except Exception as e:
+                db.session.rollback()
+                log.error(f"Poster mirror error for movie {movie.id}: {e}")
+    return mirrored
+
+BARCODE_PATTERN = re.compile(r'^\d{6,14}$')
+
+def extract_barcodes(content, is_csv=False):
+    """Pull barcodes out of pasted text or CSV content.
+
+    CSV input uses a column named barcode/upc/ean if there is a header,
+    otherwise the first column. Returns (barcodes, invalid) with
+    duplicates removed and input order kept.
+    """
+    if is_csv:
+        rows = list(csv.reader(io.StringIO(content)))
+        column = 0
+        if rows:
+            header = [cell.strip().lower() for cell in rows[0]]
+            for name in ('barcode', 'upc', 'ean'):
+                if name in header:
+                    column = header.index(name)
+                    rows = rows[1:]
+                    break
+        values = [row[column] for row in rows if len(row) > column]
+    else:
+        values = re.split(r'[\s,;]+', content)
+
+    barcodes, invalid = [], []
+    for value in values:
+        value = value.strip().replace('-', '')
+        if not value:
+            continue
+        if BARCODE_PATTERN.match(value):
+            barcodes.append(value)
+        else:
+            invalid.append(value)
+
+    return list(dict.fromkeys(barcodes)), invalid
+
+def create_import_job(barcodes, location=None, condition=None, skip_existing=True):
+    """Queue an import job for a list of unique barcodes"""
+    job = ImportJob(status='queued', location=location, condition=condition or 'Good', total=len(barcodes))
+    db.session.add(job)
+    db.session.flush()
+
+    existing = set()
+    if skip_existing:
+        for start in range(0, len(barcodes), 500):
+            chunk = barcodes[start:start + 500]
+            existing.update(barcode for (barcode,) in
+                            db.session.query(Movie.barcode).filter(Movie.barcode.in_(chunk)))
+
+    if barcodes:
+        db.session.execute(insert(ImportItem), [{
+            'job_id': job.id,
+            'barcode': barcode,
+            'status': 'skipped' if barcode in existing else 'pending',
+            'error': 'Already in collection' if barcode in existing else None
+        } for barcode in barcodes])
+
+    job.skipped = len(existing)
+    db.session.commit()
+
+    import_worker.notify()
+    return job
+
+class ImportWorker:
+    """Background thread working through queued import jobs.
+
+    Items are claimed in batches with a conditional UPDATE, so each
+    gunicorn worker can run its own ImportWorker without doing the same
+    barcode twice, and claims left behind by a crashed process are retried
+    after IMPORT_CLAIM_TIMEOUT. Lookups in a batch run concurrently and
+    are paced by the provider token buckets; a batch is written back to
+    the database in one transaction.
+    """
+
+    def __init__(self):
+        self.thread = None
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.pool = None
+
+    def ensure_started(self):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.run, name='import-worker', daemon=True)
+                self.thread.start()
+
+    def notify(self):
+        """Start the worker if needed and wake it up to look for work"""
+        self.ensure_started()
+        self.wake.set()
+
+    def run(self):
+        self.pool = ThreadPoolExecutor(max_workers=app.config['IMPORT_WORKERS'], thread_name_prefix='import')
+        while True:
+            try:
+                with app.app_context():
+                    pause = self.process_next_batch()
+            except Exception as e:
+                log.error(f"Import worker error: {e}")
+                pause = 30
+
+            if pause is None:
+                # Idle: sleep until a new job is queued (or check again in a while)
+                self.wake.wait(timeout=60)
+                self.wake.clear()
+            elif pause > 0:
+                time.sleep(pause)
+
+    def process_next_batch(self):
+        """Process one batch; returns seconds to pause, or None when idle"""
+        now = datetime.utcnow()
+
+        # Hand back items claimed by a process that never finished them
+        stale = now - timedelta(seconds=app.config['IMPORT_CLAIM_TIMEOUT'])
+        ImportItem.query.filter(ImportItem.status == 'running', ImportItem.claimed_at < stale).update(
+            {'status': 'pending', 'claimed_at': None}, synchronize_session=False)
+
+        job = ImportJob.query.filter(ImportJob.status.in_(['queued', 'running'])).order_by(ImportJob.id).first()
+        if job is None:
+            db.session.commit()
+            return None
+
+        if job.status == 'queued':
+            job.status = 'running'
+            job.started_at = now
+        job_id = job.id
+
+        ids = [item_id for (item_id,) in db.session.query(ImportItem.id)
+               .filter_by(job_id=job_id, status='pending')
+               .order_by(ImportItem.id)
+               .limit(app.config['IMPORT_BATCH_SIZE'])]
+
+        if not ids:
+            in_flight = ImportItem.query.filter_by(job_id=job_id, status='running').count()
+            if in_flight == 0:
+                job.status = 'completed'
+                job.finished_at = now
+                log.info(f"Import job {job_id} completed")
+            db.session.commit()
+            return 0 if in_flight == 0 else 5
+
+        ImportItem.query.filter(ImportItem.id.in_(ids), ImportItem.status == 'pending').update(
+            {'status': 'running', 'claimed_at': now}, synchronize_session=False)
+        db.session.commit()
+
+        items = ImportItem.query.filter(ImportItem.id.in_(ids), ImportItem.status == 'running',
+                                        ImportItem.claimed_at == now).all()
+        barcodes = {item.id: item.barcode for item in items}
+        db.session.commit()
+
+        futures = {self.pool.submit(self.lookup, barcode): item_id for item_id, barcode in barcodes.items()}
+        results = [(futures[future], future.result()) for future in as_completed(futures)]
+
+        return self.write_results(job_id, results)
+
+    def lookup(self, barcode):
+        """Resolve one barcode; runs on the worker pool"""
+        with app.app_context():
+            try:
+                movie_info, cached = lookup_movie_by_barcode(barcode, rate_wait=app.config['IMPORT_RATE_WAIT'],
+                                                             executor=import_lookup_executor)
+                return ('found', movie_info) if movie_info else ('not_found', None)
+            except ProviderBudgetExceeded as e:
+                return 'rate_limited', e.retry_after
+            except ProviderError as e:
+                # A provider failed or timed out; try the barcode again later
+                log.warning(f"Import lookup for {barcode} incomplete: {e}")
+                return 'rate_limited', 30
+            except Exception as e:
+                return 'failed', str(e)
+
+    def write_results(self, job_id, results):
+        """Store a batch of outcomes and new movies in one transaction"""
+        job = db.session.get(ImportJob, job_id)
+        counts = {'found': 0, 'not_found': 0, 'failed': 0, 'skipped': 0}
+        added = []
+        pause = 0
+
+        for item_id, (outcome, value) in results:
+            item = db.session.get(ImportItem, item_id)
+
+            if outcome == 'found' and app.config['UNIQUE_BARCODE_FORMAT']:
+                key = duplicate_key(item.barcode, value.get('format_type'))
+                # Autoflush makes movies added earlier in this batch visible here too
+                match = find_existing_movies({key}).get(key)
+                if match is not None:
+                    item.status = 'skipped'
+                    item.error = 'Already in collection'
+                    added.append((item, match))
+                    counts['skipped'] += 1
+                    continue
+
+            if outcome == 'found':
+                movie = Movie(
+                    title=value.get('title'),
+                    year=value.get('year'),
+                    director=value.get('director'),
+                    genre=value.get('genre'),
+                    format_type=value.get('format_type'),
+                    barcode=item.barcode,
+                    tmdb_id=value.get('tmdb_id'),
+                    poster_url=value.get('poster_url'),
+                    location=job.location,
+                    condition=job.condition or 'Good'
+                )
+                db.session.add(movie)
+                added.append((item, movie))
+                item.status = 'found'
+                item.title = value.get('title')
+                item.source = value.get('lookup_source')
+            elif outcome == 'not_found':
+                item.status = 'not_found'
+            elif outcome == 'rate_limited':
+                # Back in the queue; wait for the budget to refill
+                item.status = 'pending'
+                item.claimed_at = None
+                pause = max(pause, min(value, 300))
+                continue
+            else:
+                item.status = 'failed'
+                item.error = (value or '')[:200]
+            counts[item.status] += 1
+
+        db.session.flush()
+        for item, movie in added:
+            item.movie_id = movie.id
+
+        # Increment in SQL so concurrent workers do not overwrite each other
+        ImportJob.query.filter_by(id=job_id).update({
+            'found': ImportJob.found + counts['found'],
+            'not_found': ImportJob.not_found + counts['not_found'],
+            'failed': ImportJob.failed + counts['failed'],
+            'skipped': ImportJob.skipped + counts['skipped']
+        }, synchronize_session=False)
+        db.session.commit()
+
+        if pause:
+            log.warning(f"Import job {job_id}: provider budgets exhausted, pausing {pause:.0f}s")
+        return pause
+
+import_worker = ImportWorker()
+
+@app.before_request
+def start_import_worker():
+    # Resume unfinished jobs after a restart
+    import_worker.ensure_started()
+
+# Fields TMDb can fill in; a movie missing any of them is "incomplete"
+ENRICH_FIELDS = ('tmdb_id', 'director', 'genre', 'poster_url')
+
+def needs_enrichment(movie):
+    return any(not getattr(movie, field) for field in ENRICH_FIELDS)
+
+def enrichment_due_query(now, missing_only=False):
+    """Movies that are incomplete (and not recently tried) or due a refresh"""
+    incomplete = or_(*(func.coalesce(getattr(Movie, field), '') == '' for field in ENRICH_FIELDS))
+    retry_cutoff = now - timedelta(days=app.config['ENRICH_RETRY_DAYS'])
+    due = and_(incomplete, or_(MovieEnrichment.enriched_at.is_(None), MovieEnrichment.enriched_at < retry_cutoff))
+
+    if app.config['ENRICH_REFRESH_DAYS'] and not missing_only:
+        refresh_cutoff = now - timedelta(days=app.config['ENRICH_REFRESH_DAYS'])
+        last_enriched = func.coalesce(MovieEnrichment.enriched_at, Movie.added_date)
+        due = or_(due, and_(func.coalesce(Movie.tmdb_id, '') != '', last_enriched < refresh_cutoff))
+
+    return Movie.query.outerjoin(MovieEnrichment, MovieEnrichment.movie_id == Movie.id).filter(due)
+
+def fetch_enrichment(tmdb_id, title, year):
+    """TMDb fields for a stored movie, or None if TMDb has no match; raises on request errors"""
+    if tmdb_id:
+        try:
+            details = tmdb.get_movie(tmdb_id)
+            return tmdb_movie_info(details, details)
+        except requests.exceptions.HTTPError as e:
+            if e.response is None or e.response.status_code != 404:
+                raise
+            # Stale id; fall back to searching by title
+
+    query = titles.clean_title(title) or title
+    results = tmdb.search(query, year)
+    if not results and year:
+        results = tmdb.search(query)
+    if not results:
+        return None
+    return tmdb_movie_info(results[0], tmdb.get_movie(results[0]['id']))
+
+def apply_enrichment(movie, info):
+    """Fill in missing fields; TMDb values win for movies already linked to that TMDb id.
+    Returns True if anything changed"""
+    linked = movie.tmdb_id and movie.tmdb_id == info.get('tmdb_id')
+    changed = False
+    for field in ('tmdb_id', 'year', 'director', 'genre', 'poster_url'):
+        value = info.get(field)
+        if isinstance(value, str):
+            value = value[:Movie.__table__.columns[field].type.length]
+        current = getattr(movie, field)
+        if value and value != current and (not current or (linked and field != 'year')):
+            setattr(movie, field, value)
+            changed = True
+    return changed
+
+class EnrichmentWorker:
+    """Background thread filling in and refreshing movie metadata from TMDb.
+
+    Movies are claimed in batches through movie_enrichment (an upsert that
+    only takes rows nobody else holds, so several gunicorn workers or the
+    CLI can run at once), resolved concurrently - TMDb calls are paced by
+    its token bucket - and written back in one transaction per batch. Every
+    finished movie is stamped, so a run that is stopped part way simply
+    continues with the rest the next time it is started.
+    """
+
+    def __init__(self):
+        self.thread = None
+        self.lock = threading.Lock()
+        self.pool = None
+        self.rerun = False
+        self.progress = {'state': 'idle'}
+
+    def get_pool(self):
+        with self.lock:
+            if self.pool is None:
+                self.pool = ThreadPoolExecutor(max_workers=app.config['ENRICH_WORKERS'], thread_name_prefix='enrich')
+            return self.pool
+
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, limit=None, missing_only=False):
+        """Run a pass in the background; returns False if one is already running"""
+        with self.lock:
+            if self.running():
+                return False
+            self.progress = {'state': 'running', 'missing_only': missing_only, 'limit': limit}
+            self.thread = threading.Thread(target=self.run, args=(limit, missing_only),
+                                           name='enrichment-worker', daemon=True)
+            self.thread.start()
+            return True
+
+    def notify(self):
+        """Fill in newly added movies, after the current pass if one is running"""
+        if not self.start(missing_only=True):
+            self.rerun = True
+
+    def run(self, limit=None, missing_only=False):
+        while True:
+            self.rerun = False
+            try:
+                with app.app_context():
+                    self.run_pass(limit, missing_only)
+            except Exception as e:
+                self.progress.update(state='failed', error=str(e))
+                log.error(f"Enrichment worker error: {e}")
+                return
+            if not self.rerun:
+                return
+            limit, missing_only = None, True
+
+    def run_pass(self, limit=None, missing_only=False):
+        """Enrich due movies batch by batch until none are left (or `limit` are done)"""
+        started = datetime.utcnow()
+        self.progress = {'state': 'running', 'missing_only': missing_only, 'limit': limit,
+                         'started_at': started.isoformat(), 'finished_at': None, 'processed': 0,
+                         'updated': 0, 'unchanged': 0, 'not_found': 0, 'failed': 0}
+
+        # Forget movies that have been deleted
+        MovieEnrichment.query.filter(~MovieEnrichment.movie_id.in_(db.session.query(Movie.id))).delete(
+            synchronize_session=False)
+        db.session.commit()
+
+        failed_ids = set()  # not retried within this pass
+        while not limit or self.progress['processed'] < limit:
+            batch_size = app.config['ENRICH_BATCH_SIZE']
+            if limit:
+                batch_size = min(batch_size, limit - self.progress['processed'])
+            movies = self.claim_batch(batch_size, missing_only, failed_ids)
+            if not movies:
+                break
+
+            futures = {self.get_pool().submit(fetch_enrichment, tmdb_id, title, year): movie_id
+                       for movie_id, tmdb_id, title, year in movies}
+            results = {}
+            for future in as_completed(futures):
+                try:
+                    results[futures[future]] = ('found', future.result())
+                except Exception as e:
+                    results[futures[future]] = ('failed', str(e))
+            self.write_results(results, failed_ids)
+
+        self.progress.update(state='completed', finished_at=datetime.utcnow().isoformat())
+        log.info(f"Enrichment finished: {self.progress['processed']} movies, {self.progress['updated']} updated, "
+                 f"{self.progress['not_found']} not found, {self.progress['failed']} failed")
+        return self.progress
+
+    def claim_batch(self, batch_size, missing_only, exclude):
+        """Claim up to batch_size due movies; returns [(id, tmdb_id, title, year)]"""
+        now = datetime.utcnow()
+        stale = now - timedelta(seconds=app.config['ENRICH_CLAIM_TIMEOUT'])
+
+        query = enrichment_due_query(now, missing_only).filter(
+            or_(MovieEnrichment.claimed_at.is_(None), MovieEnrichment.claimed_at < stale))
+        if exclude:
+            query = query.filter(~Movie.id.in_(exclude))
+        ids = [movie_id for (movie_id,) in query.with_entities(Movie.id).order_by(Movie.id).limit(batch_size)]
+        if not ids:
+            db.session.commit()
+            return []
+
+        claim = sqlite_insert(MovieEnrichment).values([{'movie_id': movie_id, 'claimed_at': now} for movie_id in ids])
+        db.session.execute(claim.on_conflict_do_update(
+            index_elements=['movie_id'],
+            set_={'claimed_at': now},
+            where=or_(MovieEnrichment.claimed_at.is_(None), MovieEnrichment.claimed_at < stale)
+        ))
+        db.session.commit()
+
+        movies = db.session.query(Movie.id, Movie.tmdb_id, Movie.title, Movie.year).join(
+            MovieEnrichment, MovieEnrichment.movie_id == Movie.id
+        ).filter(Movie.id.in_(ids), MovieEnrichment.claimed_at == now).all()
+        db.session.commit()
+        return movies
+
+    def write_results(self, results, failed_ids):
+        """Apply a batch of TMDb results and release the claims in one transaction"""
+        now = datetime.utcnow()
+        movies = {movie.id: movie for movie in Movie.query.filter(Movie.id.in_(list(results)))}
+        states = {state.movie_id: state for state in MovieEnrichment.query.filter(
+            MovieEnrichment.movie_id.in_(list(results)))}
+
+        for movie_id, (outcome, value) in results.items():
+            state = states[movie_id]
+            state.claimed_at = None
+            movie = movies.get(movie_id)
+
+            if outcome == 'failed':
+                state.status, state.error = 'failed', value[:200]
+                failed_ids.add(movie_id)
+            elif movie is None or value is None:
+                state.status, state.error, state.enriched_at = 'not_found', None, now
+            else:
+                state.status = 'updated' if apply_enrichment(movie, value) else 'unchanged'
+                state.error, state.enriched_at = None, now
+            self.progress[state.status] += 1
+        self.progress['processed'] += len(results)
+
+        db.session.commit()
+
+enrichment_worker = EnrichmentWorker()
+
+# Sort keys accepted by /api/movies: column expression and direction.
+# Every sort is tie-broken on id so keyset cursors are unambiguous.
+MOVIE_SORTS = {
+    'added_date': (Movie.added_date, 'desc'),
+    'title': (Movie.title.collate('NOCASE'), 'asc'),
+    'year': (Movie.year, 'desc'),
+    'format_type': (Movie.format_type, 'asc')
+}
+
+def encode_cursor(sort, movie):
+    """Build an opaque cursor pointing just after the given movie"""
+    value = getattr(movie, sort)
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([sort, value, movie.id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+def decode_cursor(cursor, sort):
+    """Return (value, id) from a cursor, raising ValueError if it is unusable"""
+    try:
+        cursor_sort, value, last_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+    if cursor_sort != sort:
+        raise ValueError('Cursor does not match sort order')
+    if sort == 'added_date' and value is not None:
+        value = datetime.fromisoformat(value)
+    return value, int(last_id)
+
+def keyset_condition(column, direction, value, last_id):
+    """Rows strictly after (value, last_id) in the given ordering.
+
+    SQLite sorts NULLs first ascending and last descending, so NULL
+    values need their own branches.
+    """
+    if direction == 'asc':
+        if value is None:
+            return or_(and_(column.is_(None), Movie.id > last_id), column.isnot(None))
+        return or_(column > value, and_(column == value, Movie.id > last_id))
+
+    if value is None:
+        return and_(column.is_(None), Movie.id < last_id)
+    return or_(column < value, and_(column == value, Movie.id < last_id), column.is_(None))
+
+def build_fts_query(search):
+    """Turn free text into an FTS5 prefix query ("alien" -> "alien"*), or None"""
+    terms = re.findall(r'\w+', search, re.UNICODE)
+    if not terms:
+        return None
+    return ' '.join(f'"{term}"*' for term in terms)
+
+def search_movies(search, limit=20, offset=0):
+    """Ranked full-text search returning (movie, rank, title_html, snippet_html) tuples"""
+    match = build_fts_query(search)
+    if match is None:
+        return []
+
+    # Mark matches with control characters so the text can be HTML-escaped
+    # before the markers are turned into <mark> tags
+    rows = db.session.execute(text(
+        """SELECT rowid,
+                  bm25(movie_fts, :w_title, :w_director, :w_genre, :w_location) AS rank,
+                  highlight(movie_fts, 0, char(2), char(3)) AS title_html,
+                  snippet(movie_fts, -1, char(2), char(3), '...', 12) AS snippet_html
+           FROM movie_fts
+           WHERE movie_fts MATCH :match
+           ORDER BY rank
+           LIMIT :limit OFFSET :offset"""
+    ), {
+        'match': match, 'limit': limit, 'offset': offset,
+        'w_title': SEARCH_WEIGHTS[0], 'w_director': SEARCH_WEIGHTS[1],
+        'w_genre': SEARCH_WEIGHTS[2], 'w_location': SEARCH_WEIGHTS[3]
+    }).all()
+
+    movies = {movie.id: movie for movie in Movie.query.filter(Movie.id.in_([row.rowid for row in rows]))}
+
+    def to_html(value):
+        return html.escape(value or '').replace('\x02', '<mark>').replace('\x03', '</mark>')
+
+    return [(movies[row.rowid], row.rank, to_html(row.title_html), to_html(row.snippet_html))
+            for row in rows if row.rowid in movies]
+
+def query_movies(sort='added_date', format_type=None, search=None):
+    """Build the filtered and ordered Movie query used by the listing API"""
+    column, direction = MOVIE_SORTS[sort]
+    query = Movie.query
+
+    if format_type:
+        query = query.filter(Movie.format_type == format_type)
+
+    if search:
+        match = build_fts_query(search)
+        if match is None:
+            return query.filter(false())
+        matching_ids = text('SELECT rowid FROM movie_fts WHERE movie_fts MATCH :match')
+        query = query.filter(Movie.id.in_(matching_ids.bindparams(match=match).columns(rowid=db.Integer)))
+
+    if direction == 'asc':
+        return query.order_by(column.asc(), Movie.id.asc())
+    return query.order_by(column.desc(), Movie.id.desc())
+
+def grouped_counts(column):
+    """Number of movies per distinct value of a column (blank values count as 'Unknown')"""
+    rows = db.session.query(column, func.count(Movie.id)).group_by(column).all()
+
+    counts = {}
+    for value, count in rows:
+        key = value or 'Unknown'
+        counts[key] = counts.get(key, 0) + count
+    return counts
+
+def collection_stats():
+    """Aggregate collection statistics, computed in SQL"""
+    formats = grouped_counts(Movie.format_type)
+    latest = Movie.query.order_by(Movie.added_date.desc(), Movie.id.desc()).first()
+
+    return {
+        'total': sum(formats.values()),
+        'formats': formats,
+        'distinct_formats': len([name for name in formats if name != 'Unknown']),
+        'conditions': grouped_counts(Movie.condition),
+        'locations': grouped_counts(Movie.location),
+        'latest_addition': {
+            'id': latest.id,
+            'title': latest.title,
+            'added_date': latest.added_date.isoformat() if latest.added_date else None
+        } if latest else None
+    }
+
+MOVIE_FIELDS = ('title', 'year', 'director', 'genre', 'format_type', 'barcode',
+                'tmdb_id', 'poster_url', 'location', 'condition')
+DUPLICATE_POLICIES = ('skip', 'update', 'allow')
+
+def duplicate_key(barcode, format_type):
+    """Identity used for duplicate detection, or None for movies without a barcode"""
+    return (barcode, format_type or '') if barcode else None
+
+def validate_movie_data(data):
+    """Return (fields, None) for a valid movie payload, or (None, error)"""
+    if not isinstance(data, dict):
+        return None, 'Expected a JSON object'
+
+    fields = {}
+    for name in MOVIE_FIELDS:
+        value = data.get(name)
+        if name == 'year':
+            if value in (None, ''):
+                value = None
+            else:
+                try:
+                    value = int(value)
+                except (TypeError, ValueError):
+                    return None, 'Year must be a number'
+                if not 1870 <= value <= 2100:
+                    return None, 'Year is out of range'
+        elif value is not None:
+            value = str(value).strip() or None
+            max_length = Movie.__table__.columns[name].type.length
+            if value and len(value) > max_length:
+                return None, f"{name} is longer than {max_length} characters"
+        fields[name] = value
+
+    if not fields['title']:
+        return None, 'Title is required'
+    fields['condition'] = fields['condition'] or 'Good'
+    return fields, None
+
+def find_existing_movies(keys):
+    """Map duplicate keys to the oldest movie already stored for each"""
+    existing = {}
+    barcodes = sorted({barcode for barcode, format_type in keys})
+    for start in range(0, len(barcodes), 500):
+        query = Movie.query.filter(Movie.barcode.in_(barcodes[start:start + 500])).order_by(Movie.id)
+        for movie in query:
+            key = duplicate_key(movie.barcode, movie.format_type)
+            if key in keys:
+                existing.setdefault(key, movie)
+    return existing
+
+def stage_movies(rows, on_duplicate):
+    """Validate rows and add/update movies in the session; returns [(result, movie)]"""
+    allow_copies = on_duplicate == 'allow' and not app.config['UNIQUE_BARCODE_FORMAT']
+    cleaned = [validate_movie_data(row) for row in rows]
+    keys = {duplicate_key(fields['barcode'], fields['format_type']) for fields, error in cleaned if fields}
+    keys.discard(None)
+    existing = find_existing_movies(keys) if keys and not allow_copies else {}
+
+    staged = []
+    for index, (row, (fields, error)) in enumerate(zip(rows, cleaned)):
+        if error:
+            staged.append(({'index': index, 'status': 'invalid', 'error': error}, None))
+            continue
+
+        key = duplicate_key(fields['barcode'], fields['format_type'])
+        match = existing.get(key) if key else None
+        if match is not None:
+            if on_duplicate == 'update':
+                # Only overwrite what the row actually sent
+                for name in MOVIE_FIELDS:
+                    if name in row and name not in ('barcode', 'format_type'):
+                        setattr(match, name, fields[name])
+                staged.append(({'index': index, 'status': 'updated'}, match))
+            elif on_duplicate == 'allow':
+                staged.append(({'index': index, 'status': 'duplicate',
+                                'error': 'Already in collection (unique barcode index is enabled)'}, match))
+            else:
+                staged.append(({'index': index, 'status': 'skipped', 'error': 'Already in collection'}, match))
+            continue
+
+        movie = Movie(**fields)
+        db.session.add(movie)
+        if key and not allow_copies:
+            existing[key] = movie  # later rows in the same batch are duplicates of this one
+        staged.append(({'index': index, 'status': 'added'}, movie))
+
+    db.session.flush()
+    return staged
+
+def add_movies(rows, on_duplicate='skip'):
+    """Validate and add many movies in a single transaction, with one result per row"""
+    for attempt in range(2):
+        try:
+            staged = stage_movies(rows, on_duplicate)
+            db.session.commit()
+            break
+        except IntegrityError:
+            # Another request added the same barcode in the meantime; look again
+            db.session.rollback()
+            if attempt:
+                raise
+    # Fill in what manual entries lack off the request path
+    if app.config['ENRICH_ON_ADD'] and any(
+            movie is not None and result['status'] in ('added', 'updated') and needs_enrichment(movie)
+            for result, movie in staged):
+        enrichment_worker.notify()
+    return [dict(result, movie=movie.to_dict()) if movie is not None else result for result, movie in staged]
+
+EXPORT_FIELDS = ('id',) + MOVIE_FIELDS + ('added_date',)
+EXPORT_FORMATS = ('ndjson', 'csv')
+
+def iter_export_rows():
+    """Every movie as a dict, read in EXPORT_BATCH_SIZE keyset pages"""
+    columns = [getattr(Movie, field) for field in EXPORT_FIELDS]
+    last_id = 0
+    while True:
+        # Plain rows rather than Movie objects, so the session does not grow
+        rows = db.session.query(*columns).filter(Movie.id > last_id).order_by(Movie.id) \
+            .limit(app.config['EXPORT_BATCH_SIZE']).all()
+        if not rows:
+            return
+        for row in rows:
+            movie = row._asdict()
+            movie['added_date'] = movie['added_date'].isoformat() if movie['added_date'] else None
+            yield movie
+        last_id = rows[-1].id
+
+def iter_export_lines(file_format):
+    """The collection as NDJSON or CSV text, one batch of lines at a time"""
+    if file_format == 'csv':
+        yield ','.join(EXPORT_FIELDS) + '\r\n'
+
+    rows = iter_export_rows()
+    while True:
+        batch = list(itertools.islice(rows, app.config['EXPORT_BATCH_SIZE']))
+        if not batch:
+            return
+        if file_format == 'csv':
+            buffer = io.StringIO()
+            csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS).writerows(batch)
+            yield buffer.getvalue()
+        else:
+            yield ''.join(json.dumps(movie) + '\n' for movie in batch)
+
+def iter_import_rows(text_stream, file_format):
+    """Yield (line number, row dict or error message) from NDJSON or CSV text, one row at a time"""
+    if file_format == 'csv':
+        reader = csv.DictReader(text_stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for number, line in enumerate(text_stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield number, f"Invalid JSON: {e}"
+            continue
+        yield number, row if isinstance(row, dict) else 'Expected a JSON object'
+
+def import_keys(barcode, tmdb_id, format_type):
+    """Identities a movie is deduplicated on: barcode, else TMDb id (each per format)"""
+    keys = []
+    if barcode:
+        keys.append(('barcode', barcode, format_type or ''))
+    if tmdb_id:
+        keys.append(('tmdb', tmdb_id, format_type or ''))
+    return keys
+
+def find_import_matches(keys):
+    """Map import keys to the oldest stored movie with that identity"""
+    matches = {}
+    for kind, column in (('barcode', Movie.barcode), ('tmdb', Movie.tmdb_id)):
+        values = sorted({value for key_kind, value, format_type in keys if key_kind == kind})
+        for start in range(0, len(values), 500):
+            for movie in Movie.query.filter(column.in_(values[start:start + 500])).order_by(Movie.id):
+                for key in import_keys(movie.barcode, movie.tmdb_id, movie.format_type):
+                    matches.setdefault(key, movie)
+    return matches
+
+def stage_import_chunk(chunk, on_duplicate, seen):
+    """Validate one chunk of (line, row) pairs and stage its movies.
+
+    Returns ([(line, status, error)], number of added movies missing TMDb details).
+    """
+    allow_copies = on_duplicate == 'allow' and not app.config['UNIQUE_BARCODE_FORMAT']
+
+    parsed = []
+    for line, row in chunk:
+        if isinstance(row, str):
+            parsed.append((line, row, None, row))
+            continue
+        fields, error = validate_movie_data(row)
+        if fields and row.get('added_date'):
+            try:
+                fields['added_date'] = datetime.fromisoformat(str(row['added_date']).replace('Z', ''))
+            except ValueError:
+                fields, error = None, 'Invalid added_date'
+        parsed.append((line, row, fields, error))
+
+    matches = {}
+    if not allow_copies:
+        keys = {key for line, row, fields, error in parsed if fields
+                for key in import_keys(fields['barcode'], fields['tmdb_id'], fields['format_type'])}
+        matches = find_import_matches(keys) if keys else {}
+
+    results = []
+    incomplete = 0
+    for line, row, fields, error in parsed:
+        if error:
+            results.append((line, 'invalid', error))
+            continue
+
+        keys = import_keys(fields['barcode'], fields['tmdb_id'], fields['format_type'])
+        if keys and not allow_copies:
+            # Rows match on their first identity: the barcode when there is one
+            if keys[0] in seen:
+                results.append((line, 'skipped', None))
+                continue
+            seen.update(keys)
+            match = matches.get(keys[0])
+            if match is not None:
+                if on_duplicate == 'update':
+                    # Blank CSV cells mean "not given", not "clear this field"
+                    for name in MOVIE_FIELDS:
+                        if row.get(name) not in (None, '') and name not in ('barcode', 'format_type'):
+                            setattr(match, name, fields[name])
+                    results.append((line, 'updated', None))
+                else:
+                    results.append((line, 'skipped', None))
+                continue
+
+        movie = Movie(**fields)
+        db.session.add(movie)
+        incomplete += needs_enrichment(movie)
+        results.append((line, 'added', None))
+
+    db.session.flush()
+    return results, incomplete
+
+class ImportInterrupted(Exception):
+    """An import stopped part way; chunks before summary['line'] are already saved"""
+
+    def __init__(self, summary):
+        super().__init__(f"Import stopped at line {summary['line']}: {summary['error']}")
+        self.summary = summary
+
+def import_movie_rows(rows, on_duplicate='skip', dry_run=False):
+    """Import parsed rows in IMPORT_CHUNK_SIZE transactions; returns counts and the first problems.
+
+    Rows that match a stored movie (or an earlier row) on barcode, or on
+    TMDb id when there is no barcode, are skipped or updated. A dry run
+    does the same work and rolls every chunk back.
+
+    If reading or saving a chunk fails, ImportInterrupted is raised with
+    the summary so far, marked partial, and the first line that was not
+    saved. Running the import again with on_duplicate=skip picks up from
+    there.
+    """
+    counts = Counter()
+    problems = []
+    seen = set()
+    enrich = False
+    next_line = 1
+
+    def summary(**extra):
+        return dict({'dry_run': dry_run, 'rows': sum(counts.values()), 'counts': dict(counts),
+                     'problems': problems, 'partial': False}, **extra)
+
+    while True:
+        chunk = []
+        try:
+            for line, row in itertools.islice(rows, app.config['IMPORT_CHUNK_SIZE']):
+                chunk.append((line, row))
+            if not chunk:
+                break
+            results, incomplete = stage_import_chunk(chunk, on_duplicate, seen)
+            if dry_run:
+                db.session.rollback()
+            else:
+                db.session.commit()
+                enrich = enrich or incomplete > 0
+        except IntegrityError:
+            # Only possible with the unique barcode index, when a request added the same movie meanwhile
+            db.session.rollback()
+            results = [(line, 'failed', 'Conflicts with a movie added during the import') for line, row in chunk]
+        except Exception as e:
+            db.session.rollback()
+            if enrich and not dry_run and app.config['ENRICH_ON_ADD']:
+                enrichment_worker.notify()
+            raise ImportInterrupted(summary(partial=True, line=chunk[0][0] if chunk else next_line,
+                                            error=str(e))) from e
+
+        for line, status, error in results:
+            counts[status] += 1
+            if error and len(problems) < 100:
+                problems.append({'line': line, 'status': status, 'error': error})
+        next_line = chunk[-1][0] + 1
+
+    if enrich and not dry_run and app.config['ENRICH_ON_ADD']:
+        enrichment_worker.notify()
+    return summary()
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    metrics.start_trace()
+
+@app.after_request
+def record_request_metrics(response):
+    # WebSocket handlers return when the connection closes; that is not a request latency
+    if 'request_started' not in g or request.headers.get('Upgrade', '').lower() == 'websocket':
+        return response
+
+    elapsed = time.perf_counter() - g.request_started
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    REQUEST_SECONDS.observe(elapsed, route=route, method=request.method, status=response.status_code)
+
+    slow_after = app.config['SLOW_REQUEST_SECONDS']
+    if slow_after and elapsed >= slow_after:
+        spans = ', '.join(f"{name}={seconds * 1000:.0f}ms" for name, seconds in metrics.current_trace.get() or [])
+        log.warning(f"Slow request {request.method} {request.path} -> {response.status_code} "
+                    f"in {elapsed * 1000:.0f}ms [{spans}]")
+    return response
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus scrape endpoint"""
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/')
+def index():
+    return render_template('index.html')
+
+@app.route('/scan')
+def scan():
+    return render_template('scan.html')
+
+@app.route('/collection')
+def collection():
+    return render_template('collection.html')
+
+@app.route('/posters/<key>/<size>')
+def poster_file(key, size):
+    """Serve a mirrored poster. Keys are derived from the source URL, so files never change."""
+    if size not in posters.POSTER_SIZES or not re.fullmatch(r'[0-9a-f]{20}', key):
+        abort(404)
+
+    filename = f"{size}.{posters.POSTER_EXTENSION}"
+    response = send_from_directory(os.path.join(app.config['POSTER_FOLDER'], key), filename,
+                                   max_age=365 * 24 * 3600)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+@app.route('/api/scan_barcode', methods=['POST'])
+def scan_barcode():
+    """Decode barcodes from an uploaded frame.
+
+    Accepts a raw image body (Content-Type: image/jpeg, image/png, ...),
+    a multipart upload with an 'image' file, or the original JSON body
+    with a base64 'image' data URL. ?max_dim= overrides the downscale limit.
+    """
+    try:
+        max_dimension = request.args.get('max_dim', app.config['SCAN_MAX_DIMENSION'], type=int)
+        
+        if request.mimetype.startswith('image/') or request.mimetype == 'application/octet-stream':
+            image_bytes = request.get_data(cache=False)
+            if not image_bytes:
+                return jsonify({'error': 'No image data provided'}), 400
+            barcodes, stages = decode_barcode_bytes(image_bytes, max_dimension)
+        elif request.mimetype == 'multipart/form-data':
+            upload = request.files.get('image')
+            if not upload:
+                return jsonify({'error': 'No image data provided'}), 400
+            barcodes, stages = decode_barcode_bytes(upload.read(), max_dimension)
+        else:
+            data = request.get_json()
+            image_data = data.get('image')
+            
+            if not image_data:
+                return jsonify({'error': 'No image data provided'}), 400
+            
+            barcodes, stages = decode_barcode(image_data, max_dimension)
+        
+        if not barcodes:
+            return jsonify({'error': 'No barcode found in image', 'stages': stages}), 400
+
+        return jsonify({
+            'success': True,
+            'barcodes': barcodes,
+            'stages': stages
+        })
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/scan_batch', methods=['POST'])
+def scan_batch():
+    """Decode many images at once, streaming NDJSON results as each finishes.
+
+    Accepts a multipart upload with one or more 'images' files and/or a zip
+    'archive', or a raw application/zip body. Every barcode in each image is
+    reported, so shelf photos with several cases work. The last line is a
+    summary: {"done": true, "images": n, "barcodes": n}.
+    """
+    max_dimension = request.args.get('max_dim', type=int)
+    max_size = app.config['SCAN_ARCHIVE_MAX_IMAGE_SIZE']
+    budget = {'remaining': app.config['SCAN_ARCHIVE_MAX_TOTAL_SIZE']}
+
+    if request.mimetype in ('application/zip', 'application/x-zip-compressed'):
+        sources = [iter_zip_images(io.BytesIO(request.get_data()), max_size, budget)]
+    elif request.mimetype == 'multipart/form-data':
+        uploads = [upload for upload in request.files.getlist('images') if upload.filename]
+        archives = [upload for upload in request.files.getlist('archive') if upload.filename]
+        sources = [((upload.filename, upload.read()) for upload in uploads)]
+        sources += [iter_zip_images(archive.stream, max_size, budget) for archive in archives]
+        if not uploads and not archives:
+            return jsonify({'error': 'No images provided'}), 400
+    else:
+        return jsonify({'error': 'Send multipart images/archive or an application/zip body'}), 400
+
+    def generate():
+        images = barcodes = 0
+        try:
+            for source in sources:
+                for result in scan_images_in_pool(source, max_dimension):
+                    images += 1
+                    barcodes += len(result['barcodes'])
+                    yield json.dumps(result) + '\n'
+        except zipfile.BadZipFile as e:
+            yield json.dumps({'error': f'Invalid zip archive: {e}'}) + '\n'
+        yield json.dumps({'done': True, 'images': images, 'barcodes': barcodes}) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@sock.route('/ws/scan')
+def scan_stream(ws):
+    """Continuous scanning over a WebSocket.
+
+    The browser sends JPEG frames as binary messages. Frames that arrive
+    while a previous one is being decoded are dropped, only the newest is
+    decoded. A barcode is confirmed once SCAN_STREAM_CONFIRM_FRAMES decoded
+    frames in a row agree (frames without a code do not break the streak).
+    The server then sends {"type": "detected"} followed by {"type": "movie"}
+    with the lookup result. A text message {"type": "reset"} forgets the
+    codes confirmed so far so the same disc can be scanned again.
+    """
+    confirm_frames = app.config['SCAN_STREAM_CONFIRM_FRAMES']
+    confirmed = set()
+    streak_code, streak = None, 0
+    frames = dropped = 0
+
+    while True:
+        # Block for the next message, then skip to the newest queued one
+        message = ws.receive()
+        latest_frame = None
+        while message is not None:
+            if isinstance(message, str):
+                try:
+                    command = json.loads(message)
+                except ValueError:
+                    command = {}
+                if command.get('type') == 'reset':
+                    confirmed.clear()
+                    streak_code, streak = None, 0
+            else:
+                if latest_frame is not None:
+                    dropped += 1
+                latest_frame = message
+            message = ws.receive(timeout=0)
+
+        if latest_frame is None:
+            continue
+
+        frames += 1
+        try:
+            decoder = load_decoder()
+            barcodes, stages = decoder.decode_bytes(latest_frame, only_stages=decoder.STREAM_STAGES)
+            record_decode_stages(stages)
+        except Exception as e:
+            ws.send(json.dumps({'type': 'error', 'error': str(e)}))
+            continue
+
+        if not barcodes:
+            continue
+
+        code = barcodes[0]['data']
+        if code in confirmed:
+            continue
+
+        if code == streak_code:
+            streak += 1
+        else:
+            streak_code, streak = code, 1
+
+        if streak < confirm_frames:
+            ws.send(json.dumps({'type': 'candidate', 'barcode': code, 'count': streak}))
+            continue
+
+        confirmed.add(code)
+        streak_code, streak = None, 0
+        log.info(f"Scan stream confirmed {code} after {frames} frames ({dropped} dropped)")
+        ws.send(json.dumps({'type': 'detected', 'barcode': code, 'barcode_type': barcodes[0]['type']}))
+
+        try:
+            movie_info, cached = lookup_movie_by_barcode(code)
+        except (ProviderBudgetExceeded, ProviderError) as e:
+            movie_info, cached = None, False
+            log.warning(f"Scan stream lookup incomplete: {e}")
+        ws.send(json.dumps({
+            'type': 'movie',
+            'barcode': code,
+            'success': movie_info is not None,
+            'movie': movie_info,
+            'cached': cached
+        }))
+
+@app.route('/api/search_movie_barcode', methods=['POST'])
+def search_movie_barcode():
+    """Endpoint for barcode-based movie searches with multiple API fallbacks"""
     try:
         data = request.get_json()
+        barcode = data.get('barcode')
         
-        movie = Movie(
-            title=data.get('title'),
-            year=data.get('year'),
-            director=data.get('director'),
-            genre=data.get('genre'),
-            format_type=data.get('format_type'),
-            barcode=data.get('barcode'),
-            tmdb_id=data.get('tmdb_id'),
-            poster_url=data.get('poster_url'),
-            location=data.get('location'),
-            condition=data.get('condition', 'Good')
-        )
+        if not barcode:
+            return jsonify({'error': 'No barcode provided'}), 400
 
-        db.session.add(movie)
-        db.session.commit()
+        try:
+            movie_info, cached = lookup_movie_by_barcode(barcode, refresh=bool(data.get('refresh')))
+        except ProviderBudgetExceeded as e:
+            return jsonify({
+                'success': False,
+                'error': 'Barcode lookup services are unavailable or over their request budget, please try again later',
+                'barcode': barcode,
+                'retry_after': round(e.retry_after)
+            }), 429
+        except ProviderError as e:
+            log.warning(f"Barcode lookup for {barcode} failed: {e}")
+            return jsonify({
+                'success': False,
+                'error': 'A barcode lookup service failed or timed out, please try again',
+                'barcode': barcode
+            }), 503
+        
+        if movie_info:
+            return jsonify({
+                'success': True,
+                'movie': movie_info,
+                'cached': cached
+            })
+        else:
+            return jsonify({
+                'success': False,
+                'error': 'Movie not found for this barcode',
+                'barcode': barcode,
+                'cached': cached
+            })
+            
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/import_jobs', methods=['POST'])
+def create_import():
+    """Queue a bulk import from a JSON list/pasted text or an uploaded CSV file"""
+    try:
+        if request.mimetype == 'multipart/form-data':
+            options = request.form
+            upload = request.files.get('file')
+            if not upload:
+                return jsonify({'error': 'No file provided'}), 400
+            content = upload.read().decode('utf-8-sig', errors='replace')
+            barcodes, invalid = extract_barcodes(content, is_csv=upload.filename.lower().endswith('.csv'))
+        else:
+            options = request.get_json() or {}
+            if options.get('barcodes'):
+                barcodes, invalid = extract_barcodes('\n'.join(str(code) for code in options['barcodes']))
+            else:
+                barcodes, invalid = extract_barcodes(options.get('text') or '')
+
+        if not barcodes:
+            return jsonify({'error': 'No valid barcodes provided', 'invalid': invalid[:100]}), 400
+
+        skip_existing = str(options.get('skip_existing', 'true')).lower() not in ('false', '0', 'no')
+        job = create_import_job(barcodes, location=options.get('location'),
+                                condition=options.get('condition'), skip_existing=skip_existing)
 
         return jsonify({
             'success': True,
-            'movie': movie.to_dict()
+            'job': job.to_dict(),
+            'invalid': invalid[:100]
+        }), 202
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/import_jobs')
+def list_imports():
+    jobs = ImportJob.query.order_by(ImportJob.id.desc()).limit(50).all()
+    return jsonify([job.to_dict() for job in jobs])
+
+@app.route('/api/import_jobs/<int:job_id>')
+def get_import(job_id):
+    job = ImportJob.query.get_or_404(job_id)
+    return jsonify(job.to_dict())
+
+@app.route('/api/import_jobs/<int:job_id>/results')
+def get_import_results(job_id):
+    """Per-barcode outcomes, optionally filtered by status; page with ?after=<last id>"""
+    ImportJob.query.get_or_404(job_id)
+
+    query = ImportItem.query.filter_by(job_id=job_id)
+    if request.args.get('status'):
+        query = query.filter_by(status=request.args['status'])
+    query = query.filter(ImportItem.id > request.args.get('after', 0, type=int))
+
+    limit = min(max(request.args.get('limit', 100, type=int), 1), 1000)
+    items = query.order_by(ImportItem.id).limit(limit + 1).all()
+    has_more = len(items) > limit
+    items = items[:limit]
+
+    return jsonify({
+        'items': [item.to_dict() for item in items],
+        'next_after': items[-1].id if has_more else None
+    })
+
+@app.route('/api/import_jobs/<int:job_id>/cancel', methods=['POST'])
+def cancel_import(job_id):
+    try:
+        job = ImportJob.query.get_or_404(job_id)
+        if job.status in ('queued', 'running'):
+            job.status = 'cancelled'
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+        return jsonify({'success': True, 'job': job.to_dict()})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/barcode_cache/<barcode>', methods=['DELETE'])
+def invalidate_barcode_cache(barcode):
+    try:
+        deleted = invalidate_cached_lookup(barcode)
+        return jsonify({'success': True, 'deleted': deleted})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/barcode_cache', methods=['DELETE'])
+def clear_barcode_cache():
+    try:
+        deleted = clear_lookup_cache()
+        return jsonify({'success': True, 'deleted': deleted})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/admin/providers')
+def provider_status():
+    """Live statistics, circuit state and current order for every barcode provider"""
+    try:
+        providers, fallback_providers = order_providers(BARCODE_PROVIDERS)
+        order = [api_name for api_name, api_function in LOCAL_BARCODE_PROVIDERS + providers + fallback_providers]
+        fallback = {api_name for api_name, api_function in fallback_providers}
+
+        result = []
+        for api_name in order:
+            stats = provider_stats[api_name]
+            summary = stats.summary()
+            bucket = provider_buckets.get(api_name)
+            for key in ('p50', 'p95'):
+                summary[f"{key}_ms"] = round(summary.pop(key) * 1000, 1) if summary[key] is not None else None
+            summary.update({
+                'name': api_name,
+                'position': order.index(api_name) + 1,
+                'fallback': api_name in fallback,
+                'score': round(stats.score(), 4),
+                'circuit': stats.breaker.state,
+                'circuit_retry_after': round(stats.breaker.retry_after(), 1),
+                'budget_retry_after': round(bucket.wait_time(), 1) if bucket else None
+            })
+            if api_name == 'UPC catalogue':
+                # Which dump is loaded, if any
+                summary['catalogue'] = upc_catalogue.info()
+            result.append(summary)
+
+        return jsonify({'providers': result, 'mode': app.config['BARCODE_LOOKUP_MODE']})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/admin/providers/<name>/reset', methods=['POST'])
+def reset_provider_circuit(name):
+    """Close a provider's circuit breaker so it is tried again straight away"""
+    if name not in provider_stats:
+        return jsonify({'error': 'Unknown provider'}), 404
+    provider_stats[name].breaker.reset()
+    return jsonify({'success': True, 'name': name, 'circuit': provider_stats[name].breaker.state})
+
+@app.route('/api/admin/enrichment')
+def enrichment_status():
+    """Progress of the current (or last) enrichment pass and how many movies are due"""
+    try:
+        now = datetime.utcnow()
+        last_results = dict(db.session.query(MovieEnrichment.status, func.count())
+                            .filter(MovieEnrichment.status.isnot(None))
+                            .group_by(MovieEnrichment.status).all())
+        return jsonify({
+            'progress': enrichment_worker.progress,
+            'due': enrichment_due_query(now).count(),
+            'due_missing': enrichment_due_query(now, missing_only=True).count(),
+            'last_results': last_results
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/admin/enrichment', methods=['POST'])
+def start_enrichment():
+    """Start a background enrichment pass; optional JSON {limit, missing_only}"""
+    data = request.get_json(silent=True) or {}
+    try:
+        limit = int(data['limit']) if data.get('limit') else None
+    except (TypeError, ValueError):
+        return jsonify({'error': 'limit must be a number'}), 400
+
+    started = enrichment_worker.start(limit=limit, missing_only=bool(data.get('missing_only')))
+    if not started:
+        return jsonify({'error': 'Enrichment is already running', 'progress': enrichment_worker.progress}), 409
+    return jsonify({'success': True, 'progress': enrichment_worker.progress}), 202
+
+@app.route('/api/search_movie', methods=['POST'])
+def search_movie():
+    try:
+        data = request.get_json()
+        title = data.get('title')
+        
+        if not title:
+            return jsonify({'error': 'No title provided'}), 400
+
+        movie_info = search_movie_by_title(title)
+        
+        if movie_info:
+            return jsonify({
+                'success': True,
+                'movie': movie_info
+            })
+        else:
+            return jsonify({'error': 'Movie not found'}), 404
+
+    except ProviderBudgetExceeded as e:
+        return jsonify({'error': 'TMDb is over its request budget, please try again later',
+                        'retry_after': round(e.retry_after)}), 429
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/add_movie', methods=['POST'])
+def add_movie():
+    try:
+        data = request.get_json()
+
+        # Copies are allowed here unless the request (or the unique index) says otherwise
+        on_duplicate = data.get('on_duplicate', 'allow')
+        if on_duplicate not in DUPLICATE_POLICIES:
+            return jsonify({'error': f"on_duplicate must be one of {', '.join(DUPLICATE_POLICIES)}"}), 400
+
+        result = add_movies([data], on_duplicate)[0]
+        if result['status'] == 'invalid':
+            return jsonify({'success': False, 'error': result['error']}), 400
+        if result['status'] in ('skipped', 'duplicate'):
+            return jsonify({'success': False, 'error': 'This movie is already in your collection',
+                            'movie': result['movie']}), 409
+
+        return jsonify({
+            'success': True,
+            'movie': result['movie'],
+            'updated': result['status'] == 'updated'
         })
 
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/add_movies', methods=['POST'])
+def add_movies_batch():
+    """Add many movies in one transaction, returning a result for every row"""
+    try:
+        data = request.get_json(silent=True)
+        rows = data.get('movies') if isinstance(data, dict) else data
+        if not isinstance(rows, list) or not rows:
+            return jsonify({'error': 'No movies provided'}), 400
+        if len(rows) > app.config['ADD_MOVIES_MAX_BATCH']:
+            return jsonify({'error': f"At most {app.config['ADD_MOVIES_MAX_BATCH']} movies per request"}), 400
+
+        on_duplicate = data.get('on_duplicate', app.config['DUPLICATE_POLICY']) if isinstance(data, dict) \
+            else app.config['DUPLICATE_POLICY']
+        if on_duplicate not in DUPLICATE_POLICIES:
+            return jsonify({'error': f"on_duplicate must be one of {', '.join(DUPLICATE_POLICIES)}"}), 400
+
+        results = add_movies(rows, on_duplicate)
+        return jsonify({
+            'success': True,
+            'results': results,
+            'counts': dict(Counter(result['status'] for result in results))
+        })
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/export')
+def export_movies():
+    """Download the whole collection as NDJSON (default) or CSV, streamed in batches"""
+    file_format = request.args.get('format', 'ndjson')
+    if file_format not in EXPORT_FORMATS:
+        return jsonify({'error': f"format must be one of {', '.join(EXPORT_FORMATS)}"}), 400
+
+    mimetype = 'text/csv' if file_format == 'csv' else 'application/x-ndjson'
+    response = Response(stream_with_context(iter_export_lines(file_format)), mimetype=mimetype)
+    response.headers['Content-Disposition'] = \
+        f"attachment; filename=movies-{datetime.utcnow():%Y%m%d}.{file_format}"
+    return response
+
+@app.route('/api/import_movies', methods=['POST'])
+def import_movies():
+    """Import an NDJSON or CSV export, read incrementally and committed in chunks.
+
+    Accepts a multipart 'file' upload or a raw text/csv or
+    application/x-ndjson body. ?format= overrides the detected format,
+    ?on_duplicate=skip|update|allow decides what happens to movies already
+    in the collection and ?dry_run=1 reports the outcome without saving.
+    """
+    try:
+        if request.mimetype == 'multipart/form-data':
+            upload = request.files.get('file')
+            if not upload or not upload.filename:
+                return jsonify({'error': 'No file provided'}), 400
+            binary, filename = upload.stream, upload.filename.lower()
+        else:
+            binary, filename = request.stream, ''
+
+        file_format = request.args.get('format') or (
+            'csv' if request.mimetype == 'text/csv' or filename.endswith('.csv') else 'ndjson')
+        if file_format not in EXPORT_FORMATS:
+            return jsonify({'error': f"format must be one of {', '.join(EXPORT_FORMATS)}"}), 400
+
+        on_duplicate = request.args.get('on_duplicate', 'skip')
+        if on_duplicate not in DUPLICATE_POLICIES:
+            return jsonify({'error': f"on_duplicate must be one of {', '.join(DUPLICATE_POLICIES)}"}), 400
+        dry_run = request.args.get('dry_run', '').lower() in ('1', 'true', 'yes')
+
+        text_stream = io.TextIOWrapper(binary, encoding='utf-8-sig', newline='')
+        summary = import_movie_rows(iter_import_rows(text_stream, file_format), on_duplicate, dry_run)
+        return jsonify(dict(summary, success=True))
+
+    except ImportInterrupted as e:
+        # Earlier chunks are saved; report them along with where it stopped
+        unreadable = isinstance(e.__cause__, (UnicodeDecodeError, csv.Error))
+        error = f"Could not read the file: {e.__cause__}" if unreadable else str(e.__cause__)
+        return jsonify(dict(e.summary, success=False, error=error)), 400 if unreadable else 500
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/movies')
 def get_movies():
-    movies = Movie.query.order_by(Movie.added_date.desc()).all()
-    return jsonify([movie.to_dict() for movie in movies])
+    """List movies.
+
+    Without paging parameters this returns the whole collection as a JSON
+    array (legacy behaviour). Passing limit and/or cursor switches to keyset
+    pagination: {movies, next_cursor, has_more}. Optional filters: sort
+    (added_date, title, year, format_type), format and q (text search).
+    """
+    sort = request.args.get('sort', 'added_date')
+    if sort not in MOVIE_SORTS:
+        return jsonify({'error': f'Unknown sort: {sort}'}), 400
+
+    query = query_movies(
+        sort=sort,
+        format_type=request.args.get('format') or None,
+        search=(request.args.get('q') or '').strip() or None
+    )
+
+    if 'limit' not in request.args and 'cursor' not in request.args:
+        return jsonify([movie.to_dict() for movie in query.all()])
+
+    try:
+        limit = min(max(int(request.args.get('limit', 50)), 1), 200)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            value, last_id = decode_cursor(cursor, sort)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        column, direction = MOVIE_SORTS[sort]
+        query = query.filter(keyset_condition(column, direction, value, last_id))
+
+    movies = query.limit(limit + 1).all()
+    has_more = len(movies) > limit
+    movies = movies[:limit]
+
+    return jsonify({
+        'movies': [movie.to_dict() for movie in movies],
+        'next_cursor': encode_cursor(sort, movies[-1]) if has_more else None,
+        'has_more': has_more
+    })
+
+@app.route('/api/movies/changes')
+def get_movie_changes():
+    """Changes after a sync cursor: upserts carry the movie, deletes are tombstones.
+
+    Start with since=0 for a full copy and keep the returned cursor.
+    reset=true means the cursor is from a different database and the
+    client should drop its copy and sync again from 0.
+    """
+    try:
+        since = request.args.get('since', 0, type=int)
+        limit = min(max(request.args.get('limit', 500, type=int), 1), 2000)
+
+        latest = db.session.query(func.max(MovieChange.seq)).scalar() or 0
+        if since < 0 or since > latest:
+            return jsonify({'changes': [], 'cursor': 0, 'has_more': False, 'reset': True})
+
+        rows = (db.session.query(MovieChange, Movie)
+                .outerjoin(Movie, Movie.id == MovieChange.movie_id)
+                .filter(MovieChange.seq > since)
+                .order_by(MovieChange.seq)
+                .limit(limit + 1)
+                .all())
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        changes = []
+        for change, movie in rows:
+            if change.op == 'delete' or movie is None:
+                changes.append({'seq': change.seq, 'op': 'delete', 'id': change.movie_id})
+            else:
+                changes.append({'seq': change.seq, 'op': 'upsert', 'id': movie.id, 'movie': movie.to_dict()})
+
+        return jsonify({
+            'changes': changes,
+            'cursor': rows[-1][0].seq if rows else since,
+            'has_more': has_more,
+            'reset': False
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/movies/search')
+def search_collection():
+    """Full-text search over title, director, genre and location with prefix matching"""
+    search = (request.args.get('q') or '').strip()
+    if not search:
+        return jsonify({'error': 'No search query provided'}), 400
+
+    try:
+        limit = min(max(int(request.args.get('limit', 20)), 1), 100)
+        offset = max(int(request.args.get('offset', 0)), 0)
+    except ValueError:
+        return jsonify({'error': 'limit and offset must be integers'}), 400
+
+    results = search_movies(search, limit=limit + 1, offset=offset)
+
+    return jsonify({
+        'results': [{
+            'movie': movie.to_dict(),
+            'rank': rank,
+            'title_highlight': title_html,
+            'snippet': snippet_html
+        } for movie, rank, title_html, snippet_html in results[:limit]],
+        'has_more': len(results) > limit
+    })
+
+@app.route('/api/stats')
+def get_stats():
+    """Collection totals, per-format/condition/location counts and latest addition"""
+    response = jsonify(collection_stats())
+
+    # Let browsers revalidate cheaply; unchanged stats come back as 304
+    response.add_etag()
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
 
 @app.route('/api/movies/<int:movie_id>', methods=['DELETE'])
 def delete_movie(movie_id):
@@ -563,7 +2911,195 @@ def delete_movie(movie_id):
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
-if __name__ == '__main__':
+def add_missing_columns():
+    """Add model columns that older databases do not have yet (nullable, no default)"""
+    inspector = inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                column_type = column.type.compile(dialect=db.engine.dialect)
+                db.session.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                log.info(f"Added column {table.name}.{column.name}")
+    db.session.commit()
+
+def init_db():
+    """Create missing tables, columns and indexes (safe to run on an existing database)"""
+    db.create_all()
+    add_missing_columns()
+
+    # create_all() skips tables that already exist, so add any newer indexes
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=db.engine, checkfirst=True)
+
+    # Full-text search index; populate it if it is new on an existing database
+    has_search_index = db.session.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'movie_fts'")
+    ).first() is not None
+    for statement in SEARCH_INDEX_SQL:
+        db.session.execute(text(statement))
+    if not has_search_index:
+        rebuild_search_index()
+
+    # Optional one-movie-per-barcode-and-format constraint
+    if app.config['UNIQUE_BARCODE_FORMAT']:
+        try:
+            db.session.execute(text(UNIQUE_BARCODE_INDEX_SQL))
+        except IntegrityError:
+            db.session.rollback()
+            duplicates = db.session.execute(text(
+                "SELECT COUNT(*) FROM (SELECT 1 FROM movie WHERE barcode IS NOT NULL AND barcode != '' "
+                "GROUP BY barcode, IFNULL(format_type, '') HAVING COUNT(*) > 1)"
+            )).scalar()
+            log.warning(f"Unique barcode index not created: {duplicates} barcode/format pairs "
+                        f"are in the collection more than once")
+    else:
+        db.session.execute(text('DROP INDEX IF EXISTS ux_movie_barcode_format'))
+
+    # Change log; seed it with the existing movies the first time
+    has_change_log = db.session.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'movie_change_ai'")
+    ).first() is not None
+    for statement in CHANGE_LOG_SQL:
+        db.session.execute(text(statement))
+    if not has_change_log:
+        db.session.execute(text(
+            "INSERT OR IGNORE INTO movie_change (movie_id, op) SELECT id, 'upsert' FROM movie ORDER BY id"
+        ))
+    db.session.commit()
+
+def rebuild_search_index():
+    """Repopulate the full-text index from the movie table"""
+    db.session.execute(text("INSERT INTO movie_fts(movie_fts) VALUES ('rebuild')"))
+    db.session.commit()
+
+@app.cli.command('init-db')
+def init_db_command():
+    """Create tables, indexes and the search index."""
+    init_db()
+    print('Database initialised')
+
+@app.cli.command('scan-images')
+@click.argument('directory', type=click.Path(exists=True, file_okay=False))
+@click.option('--workers', type=int, default=None, help='Decode processes (default: one per core).')
+@click.option('--max-dim', type=int, default=None, help='Downscale images to this longest side first.')
+def scan_images_command(directory, workers, max_dim):
+    """Decode every image under DIRECTORY, printing one JSON line per image."""
+    if workers:
+        app.config['DECODE_WORKERS'] = workers
+
+    started = time.monotonic()
+    images = barcodes = 0
+    for result in scan_images_in_pool(iter_directory_images(directory), max_dim):
+        images += 1
+        barcodes += len(result['barcodes'])
+        click.echo(json.dumps(result))
+
+    elapsed = time.monotonic() - started
+    click.echo(f"Scanned {images} images, found {barcodes} barcodes in {elapsed:.1f}s "
+               f"({app.config['DECODE_WORKERS']} workers)", err=True)
+
+@app.cli.command('mirror-posters')
+@click.option('--force', is_flag=True, help='Regenerate posters that are already mirrored.')
+def mirror_posters_command(force):
+    """Download and resize posters for movies without an up-to-date local copy."""
+    query = Movie.query.filter(Movie.poster_url.isnot(None), Movie.poster_url != '')
+    # Missing mirrors, and mirrors of a poster URL that has since changed
+    movie_ids = [movie_id for movie_id, poster_url, key in query.with_entities(Movie.id, Movie.poster_url, Movie.poster_key)
+                 if force or key != posters.poster_key(poster_url)]
+
+    # Chunks spread over the poster pool; files shared by several movies are fetched once
+    chunks = [movie_ids[start:start + 20] for start in range(0, len(movie_ids), 20)]
+    futures = [poster_executor.submit(mirror_movie_posters, chunk, force) for chunk in chunks]
+    mirrored = sum(future.result() for future in futures)
+    print(f"Mirrored posters for {mirrored} of {len(movie_ids)} movies")
+
+@app.cli.command('enrich-movies')
+@click.option('--limit', type=int, help='Stop after this many movies.')
+@click.option('--missing-only', is_flag=True, help='Only fill in incomplete movies; skip refreshing.')
+def enrich_movies_command(limit, missing_only):
+    """Fill in and refresh movie details from TMDb."""
+    progress = enrichment_worker.run_pass(limit=limit, missing_only=missing_only)
+    print(f"Enriched {progress['processed']} movies: {progress['updated']} updated, "
+          f"{progress['unchanged']} unchanged, {progress['not_found']} not found, {progress['failed']} failed")
+
+@app.cli.command('export-movies')
+@click.argument('output', type=click.File('w', encoding='utf-8'))
+@click.option('--format', 'file_format', type=click.Choice(EXPORT_FORMATS), default='ndjson')
+def export_movies_command(output, file_format):
+    """Write the whole collection to OUTPUT ('-' for stdout)."""
+    for lines in iter_export_lines(file_format):
+        output.write(lines)
+
+@app.cli.command('import-movies')
+@click.argument('source', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'file_format', type=click.Choice(EXPORT_FORMATS),
+              help='Default: csv for .csv files, ndjson otherwise.')
+@click.option('--on-duplicate', type=click.Choice(DUPLICATE_POLICIES), default='skip')
+@click.option('--dry-run', is_flag=True, help='Report what would happen without saving anything.')
+def import_movies_command(source, file_format, on_duplicate, dry_run):
+    """Import movies from an export file."""
+    init_db()
+    file_format = file_format or ('csv' if source.lower().endswith('.csv') else 'ndjson')
+    with open(source, encoding='utf-8-sig', newline='') as source_file:
+        try:
+            summary = import_movie_rows(iter_import_rows(source_file, file_format), on_duplicate, dry_run)
+        except ImportInterrupted as e:
+            summary = e.summary
+    for problem in summary['problems']:
+        print(f"line {problem['line']}: {problem['error']}", file=sys.stderr)
+    print(f"{'Would import' if dry_run else 'Imported'} {summary['rows']} rows: "
+          + ', '.join(f"{count} {status}" for status, count in sorted(summary['counts'].items())))
+    if summary['partial']:
+        raise click.ClickException(f"Stopped at line {summary['line']}: {summary['error']}. "
+                                   f"Lines before it are saved; run again with --on-duplicate skip to continue.")
+
+@app.cli.command('import-upc-catalogue')
+@click.argument('dump', type=click.Path(exists=True, dir_okay=False))
+@click.option('--barcode-column', default=None, help='Barcode column name (default: upc/ean/barcode/gtin/code).')
+@click.option('--title-column', default=None, help='Title column name (default: title/product_name/name/description).')
+@click.option('--media-only', is_flag=True, help='Only keep products whose title names a disc format.')
+def import_upc_catalogue_command(dump, barcode_column, title_column, media_only):
+    """Build the offline UPC catalogue from a CSV/TSV product dump (.gz allowed)."""
+    os.makedirs(os.path.dirname(os.path.abspath(app.config['UPC_CATALOGUE_PATH'])), exist_ok=True)
+
+    started = time.monotonic()
+    read, stored = catalogue.build_catalogue(
+        dump, app.config['UPC_CATALOGUE_PATH'], titles.normalize_titles,
+        barcode_column=barcode_column, title_column=title_column, media_only=media_only
+    )
+    print(f"Read {read} rows, stored {stored} barcodes in {app.config['UPC_CATALOGUE_PATH']} "
+          f"({time.monotonic() - started:.1f}s)")
+
+    # Earlier misses may resolve now; let them be looked up again
+    init_db()
+    forgotten = BarcodeLookup.query.filter_by(found=False).delete()
+    db.session.commit()
+    print(f"Cleared {forgotten} cached misses")
+
+@app.cli.command('rebuild-search-index')
+def rebuild_search_index_command():
+    """Rebuild the full-text search index from scratch."""
+    init_db()
+    rebuild_search_index()
+    print(f"Search index rebuilt for {Movie.query.count()} movies")
+
+def create_app():
+    """Prepare the database and return the app; gunicorn loads 'app:create_app()'.
+
+    Routes, models and workers are defined at import time as before; this
+    does the per-deployment setup that used to live under __main__. With
+    gunicorn's preload_app it runs once in the master, before forking.
+    """
     with app.app_context():
-        db.create_all()
-    app.run(host='0.0.0.0', port=5000, debug=True)
+        init_db()
+        # Forked workers must open their own SQLite connections
+        db.engine.dispose()
+    return app
+
+if __name__ == '__main__':
+    # Development server; production runs gunicorn (gunicorn.conf.py)
+    create_app().run(host='0.0.0.0', port=5000, debug=os.environ.get('FLASK_DEBUG') == '1')
@@ -0,0 +1,99 @@
+"""Decode benchmark: throughput, accuracy and memory on synthetic barcodes.
+
+    python -m benchmarks.bench_decode --codes 5 --output decode.json
+
+Runs the same path as /api/scan_barcode (decoder.decode_bytes with the
+configured downscale) over every combination of resolution, blur,
+rotation and noise, and reports per-case accuracy and latency plus
+overall throughput.
+"""
+import argparse
+import time
+import tracemalloc
+from collections import Counter
+
+import decoder
+from catalogue import normalize_barcode
+from benchmarks import synthetic
+from benchmarks.results import latency_summary, peak_rss_mb, write_results
+
+
+def found_stage(stages):
+    """Name of the stage that produced the first valid code, if any"""
+    for stage in stages:
+        if stage['found']:
+            return stage['stage']
+    return None
+
+
+def run(codes_per_case, seed, max_dimension, quick=False):
+    case_list = synthetic.cases() if not quick else synthetic.cases(
+        resolutions=(480,), blurs=(0, 3.0), rotations=(0, 20), noises=(0, 25)
+    )
+    per_case = {}
+    all_ms = []
+    decode_seconds = 0.0
+
+    tracemalloc.start()
+    for case, symbology, code, image_bytes in synthetic.generate(case_list, codes_per_case, seed):
+        started = time.perf_counter()
+        barcodes, stages = decoder.decode_bytes(image_bytes, max_dimension)
+        elapsed = time.perf_counter() - started
+        decode_seconds += elapsed
+
+        decoded = {normalize_barcode(found['data']) for found in barcodes}
+        key = tuple(sorted(case.items()))
+        entry = per_case.setdefault(key, {'case': case, 'ms': [], 'correct': 0, 'wrong': 0, 'stages': Counter()})
+        entry['ms'].append(round(elapsed * 1000, 2))
+        all_ms.append(entry['ms'][-1])
+        if normalize_barcode(code) in decoded:
+            entry['correct'] += 1
+            entry['stages'][found_stage(stages)] += 1
+        elif decoded:
+            entry['wrong'] += 1
+    _, python_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    cases = []
+    for entry in per_case.values():
+        total = len(entry['ms'])
+        cases.append(dict(entry['case'], **{
+            'images': total,
+            'accuracy': round(entry['correct'] / total, 3),
+            'misreads': entry['wrong'],
+            'found_by_stage': dict(entry['stages']),
+            'latency': latency_summary(entry['ms'])
+        }))
+
+    images = len(all_ms)
+    correct = sum(entry['correct'] for entry in per_case.values())
+    return {
+        'summary': {
+            'images': images,
+            'accuracy': round(correct / images, 3) if images else None,
+            'misreads': sum(entry['wrong'] for entry in per_case.values()),
+            'images_per_second': round(images / decode_seconds, 1) if decode_seconds else None,
+            'latency': latency_summary(all_ms),
+            'python_peak_mb': round(python_peak / (1024 * 1024), 1),
+            'peak_rss_mb': peak_rss_mb()
+        },
+        'cases': cases
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--codes', type=int, default=4, help='barcodes per distortion case')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-dim', type=int, default=1600, help='downscale frames first (0 disables)')
+    parser.add_argument('--quick', action='store_true', help='run a small subset of the cases')
+    parser.add_argument('--output', help='JSON file to write (default: stdout)')
+    args = parser.parse_args()
+
+    params = {'codes_per_case': args.codes, 'seed': args.seed, 'max_dimension': args.max_dim, 'quick': args.quick}
+    results = run(args.codes, args.seed, args.max_dim or None, args.quick)
+    write_results('decode', params, results, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""End-to-end barcode lookup benchmark against the local provider stubs.
+
+    python -m benchmarks.bench_lookup --barcodes 100 --concurrency 4 --output lookup.json
+    python -m benchmarks.bench_lookup --set upcitemdb.error_rate=0.5 --set tmdb.latency_ms=300
+
+Runs search_movie_by_barcode (no result cache) for each lookup mode and
+reports latency percentiles, how many barcodes resolved, which provider
+answered and how many requests each stubbed service received.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.results import latency_summary, peak_rss_mb, write_results
+from benchmarks.stub_server import StubServer
+
+
+def parse_overrides(values):
+    """['upcitemdb.error_rate=0.5', ...] -> {'upcitemdb': {'error_rate': 0.5}}"""
+    services = {}
+    for value in values:
+        key, number = value.split('=', 1)
+        service, setting = key.split('.', 1)
+        services.setdefault(service, {})[setting] = float(number)
+    return services
+
+
+def random_barcodes(count, seed):
+    rng = random.Random(seed)
+    return [''.join(rng.choice('0123456789') for _ in range(12)) for _ in range(count)]
+
+
+def run_mode(app, mode, barcodes, concurrency, stub):
+    # Start every mode from the same provider state
+    for stats in app.provider_stats.values():
+        stats.samples.clear()
+        stats.recent_errors.clear()
+        stats.breaker.reset()
+    app.tmdb.clear_cache()
+    requests_before = stub.requests
+
+    def lookup(barcode):
+        with app.app.app_context():
+            started = time.perf_counter()
+            try:
+                movie_info = app.search_movie_by_barcode(barcode, mode=mode)
+                outcome = movie_info['lookup_source'] if movie_info else 'not_found'
+            except app.ProviderBudgetExceeded:
+                outcome = 'skipped'
+            except app.ProviderError:
+                outcome = 'failed'
+            return round((time.perf_counter() - started) * 1000, 2), outcome
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lookup, barcodes))
+    wall = time.perf_counter() - started
+
+    outcomes = Counter(outcome for _, outcome in results)
+    found = sum(count for outcome, count in outcomes.items() if outcome not in ('not_found', 'skipped', 'failed'))
+    return {
+        'mode': mode,
+        'lookups': len(results),
+        'found_ratio': round(found / len(results), 3) if results else None,
+        'outcomes': dict(outcomes),
+        'lookups_per_second': round(len(results) / wall, 2) if wall else None,
+        'latency': latency_summary([ms for ms, _ in results]),
+        'stub_requests': {name: count - requests_before[name] for name, count in stub.requests.items()},
+        'providers': {
+            name: {key: value for key, value in stats.summary().items() if key != 'recent_errors'}
+            for name, stats in app.provider_stats.items()
+        }
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--barcodes', type=int, default=50)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--modes', default='sequential,parallel')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--set', action='append', default=[], metavar='SERVICE.SETTING=VALUE',
+                        help='override a stub setting, e.g. upcitemdb.latency_ms=500')
+    parser.add_argument('--output', help='JSON file to write (default: stdout)')
+    args = parser.parse_args()
+
+    overrides = parse_overrides(args.set)
+    with StubServer(services=overrides, seed=args.seed) as stub:
+        # Point the app at the stubs and lift request budgets before it is imported
+        os.environ.update(stub.environment())
+        for name in ('UPCITEMDB', 'OPENFOODFACTS', 'BARCODE_LOOKUP', 'TMDB'):
+            os.environ[f'{name}_RATE_LIMIT'] = '1000000/1/1000000'
+        os.environ.setdefault('LOG_LEVEL', 'ERROR')
+        # Measure the online chain only; an offline catalogue would answer first
+        os.environ['UPC_CATALOGUE_PATH'] = os.path.join(tempfile.mkdtemp(), 'upc_catalogue.db')
+        import app
+
+        barcodes = random_barcodes(args.barcodes, args.seed)
+        results = [run_mode(app, mode, barcodes, args.concurrency, stub) for mode in args.modes.split(',')]
+        services = stub.services
+
+    params = {
+        'barcodes': args.barcodes,
+        'concurrency': args.concurrency,
+        'seed': args.seed,
+        'services': services,
+        'deadline': app.app.config['BARCODE_LOOKUP_DEADLINE'],
+        'grace': app.app.config['BARCODE_LOOKUP_GRACE']
+    }
+    write_results('lookup', params, {'modes': results, 'peak_rss_mb': peak_rss_mb()}, args.output)
+
+
+if __name__ == '__main__':
+    main()
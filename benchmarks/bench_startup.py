@@ -0,0 +1,108 @@
+"""Cold-start benchmark: import time and per-worker memory, lazy vs eager vision stack.
+
+    python -m benchmarks.bench_startup --runs 5 --output startup.json
+
+Each run starts a fresh interpreter that imports the app, prepares the
+database (create_app), serves one /api/movies request and then one
+/api/scan_barcode request, recording time and resident memory after each
+step. "eager" imports OpenCV, numpy, pyzbar and PIL before the app, as
+app.py used to at module load; "lazy" is the current behaviour, where
+they load on the first scan.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.results import current_rss_mb, write_results
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def child(mode, image_path, workdir):
+    """One cold start; prints a JSON line of timings and memory"""
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'startup.db')}"
+    os.environ['UPC_CATALOGUE_PATH'] = os.path.join(workdir, 'upc_catalogue.db')
+    os.environ['ENRICH_ON_ADD'] = 'false'
+    os.environ.setdefault('LOG_LEVEL', 'ERROR')
+    with open(image_path, 'rb') as image_file:
+        image_bytes = image_file.read()
+
+    result = {'mode': mode}
+    started = time.perf_counter()
+    if mode == 'eager':
+        import decoder  # noqa: F401 - cv2, numpy, pyzbar
+        from PIL import Image  # noqa: F401
+    import app
+    result['import_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    result['import_rss_mb'] = current_rss_mb()
+
+    application = app.create_app()
+    result['ready_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    client = application.test_client()
+
+    step = time.perf_counter()
+    client.get('/api/movies')
+    result['first_request_ms'] = round((time.perf_counter() - step) * 1000, 1)
+    result['serving_rss_mb'] = current_rss_mb()
+    result['vision_loaded'] = 'cv2' in sys.modules
+
+    step = time.perf_counter()
+    client.post('/api/scan_barcode', data=image_bytes, content_type='image/jpeg')
+    result['first_scan_ms'] = round((time.perf_counter() - step) * 1000, 1)
+    result['scanning_rss_mb'] = current_rss_mb()
+    print(json.dumps(result))
+
+
+def summarize(runs):
+    """Median of every numeric field across runs"""
+    keys = [key for key, value in runs[0].items() if isinstance(value, float)]
+    summary = {key: round(statistics.median(run[key] for run in runs), 1) for key in keys}
+    summary['vision_loaded_before_scan'] = runs[0]['vision_loaded']
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help='cold starts per mode')
+    parser.add_argument('--modes', default='lazy,eager')
+    parser.add_argument('--output', help='JSON file to write (default: stdout)')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--image', help=argparse.SUPPRESS)
+    parser.add_argument('--workdir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return child(args.child, args.image, args.workdir)
+
+    from benchmarks import synthetic
+    modes = args.modes.split(',')
+    with tempfile.TemporaryDirectory() as workdir:
+        # One realistic frame, rendered up front so the children do not import OpenCV for it
+        case = synthetic.cases(resolutions=(480,), blurs=(0,), rotations=(0,), noises=(0,))
+        _, _, _, image_bytes = next(synthetic.generate(case, 1))
+        image_path = os.path.join(workdir, 'frame.jpg')
+        with open(image_path, 'wb') as image_file:
+            image_file.write(image_bytes)
+
+        runs = {mode: [] for mode in modes}
+        # Alternate modes so disk cache warm-up does not favour either
+        for _ in range(args.runs):
+            for mode in modes:
+                output = subprocess.run(
+                    [sys.executable, '-m', 'benchmarks.bench_startup', '--child', mode,
+                     '--image', image_path, '--workdir', workdir],
+                    cwd=ROOT, capture_output=True, text=True, check=True
+                ).stdout
+                runs[mode].append(json.loads(output.strip().splitlines()[-1]))
+
+    results = {mode: {'median': summarize(mode_runs), 'runs': mode_runs} for mode, mode_runs in runs.items()}
+    write_results('startup', {'runs': args.runs, 'modes': modes}, results, args.output)
+
+
+if __name__ == '__main__':
+    main()
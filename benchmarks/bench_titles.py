@@ -0,0 +1,204 @@
+"""Title normalization microbenchmark: titles.py against the replace chain it superseded.
+
+    python -m benchmarks.bench_titles --titles 20000 --output titles.json
+
+Times cleaning and format detection per title (single calls and the
+batch API) on synthetic provider titles, checks both implementations
+agree, and measures building and querying a TitleIndex the size of a
+large collection, including remakes that share an owned film's title.
+Index queries carry the release year in the product title ("Name (1984)
+[DVD]") and go through clean_title and release_year as the providers do.
+"""
+import argparse
+import random
+import time
+
+import titles
+from benchmarks.results import latency_summary, peak_rss_mb, write_results
+
+CONSONANTS = 'bcdfghjklmnprstvwz'
+VOWELS = 'aeiou'
+SUFFIXES = ('', ' [DVD]', ' [Blu-ray]', ' (4K Ultra HD + Blu-ray)', ' - Special Edition [DVD]', ' BluRay',
+            ' (Widescreen) DVD', " Director's Cut Blu-ray", ' [Region 2]', ' 4K UHD', ' blu ray', ' DVD Deluxe Edition')
+
+
+def legacy_clean_movie_title(title):
+    """clean_movie_title as it was in app.py before titles.py"""
+    if not title:
+        return title
+
+    replacements = [
+        '[DVD]', '[Blu-ray]', '[4K]', '[Ultra HD]', '[UHD]',
+        '(DVD)', '(Blu-ray)', '(4K)', '(Ultra HD)', '(UHD)',
+        'DVD', 'Blu-ray', 'BluRay', '4K UHD', 'Ultra HD',
+        '- Special Edition', '- Director\'s Cut', '- Extended Edition',
+        'Special Edition', 'Director\'s Cut', 'Extended Edition',
+        '(Widescreen)', '(Full Screen)', 'Widescreen', 'Full Screen',
+        '- Collector\'s Edition', 'Collector\'s Edition', 'Deluxe Edition',
+        '[Region 1]', '[Region 2]', '[Region 4]', '(Region 1)', '(Region 2)', '(Region 4)'
+    ]
+
+    cleaned_title = title
+    for replacement in replacements:
+        cleaned_title = cleaned_title.replace(replacement, '')
+
+    cleaned_title = cleaned_title.replace('  ', ' ').strip(' -,.')
+
+    return cleaned_title
+
+
+def legacy_detect_format_from_title(title):
+    """detect_format_from_title as it was in app.py before titles.py"""
+    if not title:
+        return None
+
+    title_lower = title.lower()
+
+    if '4k' in title_lower or 'ultra hd' in title_lower or 'uhd' in title_lower:
+        return '4K Blu-ray'
+    elif 'blu-ray' in title_lower or 'blu ray' in title_lower or 'bluray' in title_lower:
+        return 'Blu-ray'
+    elif 'dvd' in title_lower:
+        return 'DVD'
+
+    return None
+
+
+def vocabulary(size, rng):
+    """Pronounceable made-up words, so trigrams spread like they do in real titles"""
+    words = set()
+    while len(words) < size:
+        length = rng.randint(2, 9)
+        words.add(''.join(rng.choice(VOWELS if index % 2 else CONSONANTS) for index in range(length)))
+    return sorted(words)
+
+
+def movie_names(count, words, rng):
+    """Distinct films; titles differing only by a leading article count as one"""
+    names = {}
+    while len(names) < count:
+        name = ' '.join(rng.sample(words, rng.randint(1, 4))).title()
+        if rng.random() < 0.2:
+            name = f"The {name}"
+        if rng.random() < 0.1:
+            name += f" {rng.randint(2, 4)}"
+        names.setdefault(titles.match_key(name), name)
+    return sorted(names.values())
+
+
+def product_titles(names, count, rng):
+    """Provider-style titles; many repeat, as in real product dumps"""
+    return [rng.choice(names) + rng.choice(SUFFIXES) for _ in range(count)]
+
+
+def time_per_title(function, values, repeat):
+    """Best-of-repeat microseconds per title"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for value in values:
+            function(value)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best / len(values) * 1e6, 3)
+
+
+def time_batch(function, values, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function(values)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best / len(values) * 1e6, 3)
+
+
+def bench_index(names, words, lookups, rng):
+    index = titles.TitleIndex()
+    years = {name: rng.randint(1950, 2020) for name in names}
+    started = time.perf_counter()
+    for number, name in enumerate(names):
+        index.add(number, name + rng.choice(SUFFIXES), years[name], number, name)
+    build_seconds = time.perf_counter() - started
+
+    # Owned films under another product title, remakes of them (same title,
+    # another year) and films the index does not have
+    names_set = set(names)
+    unknown = [name for name in (f"{rng.choice(names)} {rng.choice(words).title()}" for _ in range(lookups))
+               if name not in names_set][:lookups // 3]
+    queries = [(name, rng.randint(1950, 2020), False) for name in unknown]
+    for _ in range(lookups // 3):
+        name = rng.choice(names)
+        queries.append((name, years[name] + rng.choice((-1, 1)) * rng.randint(5, 40), False))
+    for _ in range(lookups - len(queries)):
+        name = rng.choice(names)
+        queries.append((name, years[name], True))
+    rng.shuffle(queries)
+
+    timings, hits, wrong, remakes = [], 0, 0, 0
+    for name, year, owned in queries:
+        product_title = f"{name} ({year}){rng.choice(SUFFIXES)}"
+        started = time.perf_counter()
+        match = index.lookup(titles.clean_title(product_title), titles.release_year(product_title))
+        timings.append(round((time.perf_counter() - started) * 1e6, 1))
+        if match is not None:
+            hits += owned
+            wrong += not owned or match[0] != name
+            remakes += not owned and match[0] == name
+    return {
+        'entries': len(index),
+        'build_ms': round(build_seconds * 1000, 1),
+        'lookups': len(queries),
+        'owned_found_ratio': round(hits / max(sum(owned for name, year, owned in queries), 1), 3),
+        'wrong_matches': wrong,
+        'remake_matches': remakes,
+        'lookup_us': {key.replace('_ms', '_us'): value for key, value in latency_summary(timings).items()}
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--titles', type=int, default=20000, help='product titles to normalize')
+    parser.add_argument('--movies', type=int, default=10000, help='distinct films (also the index size)')
+    parser.add_argument('--words', type=int, default=3000, help='vocabulary size for synthetic titles')
+    parser.add_argument('--lookups', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='JSON file to write (default: stdout)')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    words = vocabulary(args.words, rng)
+    names = movie_names(args.movies, words, rng)
+    values = product_titles(names, args.titles, rng)
+
+    mismatches = sum(
+        legacy_clean_movie_title(value) != titles.clean_title(value)
+        or legacy_detect_format_from_title(value) != titles.detect_format(value)
+        for value in values
+    )
+    results = {
+        'mismatches': mismatches,
+        'clean_us': {
+            'legacy': time_per_title(legacy_clean_movie_title, values, args.repeat),
+            'titles': time_per_title(titles.clean_title, values, args.repeat)
+        },
+        'detect_format_us': {
+            'legacy': time_per_title(legacy_detect_format_from_title, values, args.repeat),
+            'titles': time_per_title(titles.detect_format, values, args.repeat)
+        },
+        'normalize_us': {
+            'legacy': time_per_title(lambda value: (legacy_clean_movie_title(value),
+                                                    legacy_detect_format_from_title(value)), values, args.repeat),
+            'batch': time_batch(titles.normalize_titles, values, args.repeat)
+        },
+        'index': bench_index(names, words, args.lookups, rng),
+        'peak_rss_mb': peak_rss_mb()
+    }
+    params = {'titles': args.titles, 'movies': args.movies, 'words': args.words, 'lookups': args.lookups,
+              'seed': args.seed}
+    write_results('titles', params, results, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Compare two benchmark result files.
+
+    python -m benchmarks.compare before.json after.json [--threshold 5]
+
+Prints every numeric result that changed by more than the threshold
+(percent), matching decode cases by their distortion settings and
+lookup runs by mode.
+"""
+import argparse
+import json
+
+
+def item_label(item, index):
+    if isinstance(item, dict):
+        if 'mode' in item:
+            return item['mode']
+        if 'width' in item:
+            return f"w{item['width']}/blur{item['blur']}/rot{item['rotation']}/noise{item['noise']}"
+    return str(index)
+
+
+def flatten(value, prefix=''):
+    """{'a': {'b': 1}, 'c': [..]} -> {'a.b': 1, 'c.<label>...': ..} for numeric leaves"""
+    if isinstance(value, bool):
+        return {}
+    if isinstance(value, (int, float)):
+        return {prefix: value}
+    flat = {}
+    if isinstance(value, dict):
+        for key, item in value.items():
+            flat.update(flatten(item, f"{prefix}.{key}" if prefix else key))
+    elif isinstance(value, list):
+        for index, item in enumerate(value):
+            label = item_label(item, index)
+            flat.update(flatten(item, f"{prefix}[{label}]"))
+    return flat
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare two benchmark result files')
+    parser.add_argument('before')
+    parser.add_argument('after')
+    parser.add_argument('--threshold', type=float, default=5.0, help='minimum change to show, in percent')
+    args = parser.parse_args()
+
+    with open(args.before) as before_file, open(args.after) as after_file:
+        before, after = json.load(before_file), json.load(after_file)
+
+    if before['benchmark'] != after['benchmark']:
+        parser.error(f"Cannot compare {before['benchmark']} with {after['benchmark']} results")
+
+    print(f"{before['benchmark']}: {before.get('git_commit')} ({before['created_at']}) -> "
+          f"{after.get('git_commit')} ({after['created_at']})")
+    if before['params'] != after['params']:
+        print('Warning: the runs used different parameters')
+
+    old, new = flatten(before['results']), flatten(after['results'])
+    for key in sorted(set(old) | set(new)):
+        if key not in old or key not in new:
+            print(f"  {key}: {old.get(key, '-')} -> {new.get(key, '-')}")
+            continue
+        if old[key] == new[key]:
+            continue
+        change = (new[key] - old[key]) / abs(old[key]) * 100 if old[key] else float('inf')
+        if abs(change) >= args.threshold:
+            print(f"  {key}: {old[key]} -> {new[key]} ({change:+.1f}%)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""Shared helpers for writing benchmark results as JSON"""
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+from datetime import datetime
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process so far (ru_maxrss is KB on Linux, bytes on macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def current_rss_mb():
+    """Resident memory of this process right now (Linux), else the peak so far"""
+    try:
+        with open('/proc/self/statm') as statm:
+            pages = int(statm.read().split()[1])
+        return round(pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024), 1)
+    except (OSError, ValueError):
+        return peak_rss_mb()
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+def latency_summary(milliseconds):
+    return {
+        'count': len(milliseconds),
+        'mean_ms': round(sum(milliseconds) / len(milliseconds), 2) if milliseconds else None,
+        'p50_ms': percentile(milliseconds, 0.5),
+        'p95_ms': percentile(milliseconds, 0.95),
+        'p99_ms': percentile(milliseconds, 0.99),
+        'max_ms': max(milliseconds) if milliseconds else None
+    }
+
+
+def write_results(name, params, results, output=None):
+    """Write a run as JSON to `output` (or stdout) with enough context to compare runs"""
+    document = {
+        'benchmark': name,
+        'created_at': datetime.utcnow().isoformat() + 'Z',
+        'git_commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'params': params,
+        'results': results
+    }
+    text = json.dumps(document, indent=2)
+    if output:
+        with open(output, 'w') as results_file:
+            results_file.write(text + '\n')
+        print(f"Results written to {output}", file=sys.stderr)
+    else:
+        print(text)
+    return document
@@ -0,0 +1,212 @@
+"""Local HTTP stand-in for UPCitemdb, Open Food Facts, Barcode Lookup and TMDb.
+
+Each service gets its own latency and failure settings, so lookup
+benchmarks can run offline against realistic (and repeatable) network
+behaviour. Every barcode maps to a deterministic movie title, so TMDb
+searches for what a provider returned always succeed.
+
+    python -m benchmarks.stub_server --port 8099   # run standalone
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# latency_ms: mean response time, jitter_ms: +/- uniform spread,
+# error_rate: share of 500 responses, quota_rate: share of 429 responses,
+# hit_rate: share of barcodes the service knows about
+DEFAULT_SERVICES = {
+    'upcitemdb': {'latency_ms': 180, 'jitter_ms': 60, 'error_rate': 0.02, 'quota_rate': 0.0, 'hit_rate': 0.8},
+    'openfoodfacts': {'latency_ms': 350, 'jitter_ms': 150, 'error_rate': 0.02, 'quota_rate': 0.0, 'hit_rate': 0.3},
+    'barcodelookup': {'latency_ms': 250, 'jitter_ms': 80, 'error_rate': 0.01, 'quota_rate': 0.0, 'hit_rate': 0.6},
+    'tmdb': {'latency_ms': 90, 'jitter_ms': 30, 'error_rate': 0.0, 'quota_rate': 0.0, 'hit_rate': 1.0}
+}
+
+FORMATS = ('DVD', 'Blu-ray', '4K Ultra HD')
+
+
+def movie_for(barcode):
+    """Deterministic (title, format, tmdb id) for a barcode"""
+    digits = re.sub(r'\D', '', barcode) or '0'
+    number = int(digits[-7:])
+    return f"Benchmark Movie {number}", FORMATS[number % len(FORMATS)], number + 1
+
+
+def knows(barcode, hit_rate):
+    """Stable per-barcode decision, so repeated runs see the same catalogue"""
+    return random.Random(f"{barcode}").random() < hit_rate
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if status == 429:
+            self.send_header('Retry-After', '30')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def simulate(self, service):
+        """Sleep for the service latency; returns an error status to send, or None"""
+        settings = self.server.services[service]
+        self.server.requests[service] += 1
+        with self.server.rng_lock:
+            delay = settings['latency_ms'] + self.server.rng.uniform(-settings['jitter_ms'], settings['jitter_ms'])
+            roll = self.server.rng.random()
+        time.sleep(max(delay, 0) / 1000)
+
+        if roll < settings['quota_rate']:
+            return 429
+        if roll < settings['quota_rate'] + settings['error_rate']:
+            return 500
+        return None
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+
+        if url.path == '/prod/trial/lookup':
+            self.upcitemdb(query.get('upc', ''))
+        elif url.path.startswith('/api/v0/product/'):
+            self.openfoodfacts(url.path.rsplit('/', 1)[-1].replace('.json', ''))
+        elif url.path == '/v3/products':
+            self.barcodelookup(query.get('barcode', ''))
+        elif url.path == '/3/search/movie':
+            self.tmdb_search(query.get('query', ''))
+        elif url.path.startswith('/3/movie/'):
+            self.tmdb_movie(url.path.rsplit('/', 1)[-1])
+        else:
+            self.send_json(404, {'error': 'unknown endpoint'})
+
+    def upcitemdb(self, barcode):
+        status = self.simulate('upcitemdb')
+        if status:
+            return self.send_json(status, {'code': 'ERROR'})
+        if not knows(barcode + 'u', self.server.services['upcitemdb']['hit_rate']):
+            return self.send_json(200, {'code': 'OK', 'total': 0, 'items': []})
+        title, format_type, _ = movie_for(barcode)
+        self.send_json(200, {'code': 'OK', 'total': 1, 'items': [
+            {'ean': barcode, 'title': f"{title} [{format_type}]", 'brand': 'Stub Studios', 'description': ''}
+        ]})
+
+    def openfoodfacts(self, barcode):
+        status = self.simulate('openfoodfacts')
+        if status:
+            return self.send_json(status, {'status': 0})
+        if not knows(barcode + 'o', self.server.services['openfoodfacts']['hit_rate']):
+            return self.send_json(200, {'status': 0, 'status_verbose': 'product not found'})
+        title, format_type, _ = movie_for(barcode)
+        self.send_json(200, {'status': 1, 'product': {
+            'product_name': f"{title} {format_type}", 'brands': 'Stub Studios', 'categories': 'Movies, DVD'
+        }})
+
+    def barcodelookup(self, barcode):
+        status = self.simulate('barcodelookup')
+        if status:
+            return self.send_json(status, {})
+        if not knows(barcode + 'b', self.server.services['barcodelookup']['hit_rate']):
+            return self.send_json(404, {})
+        title, format_type, _ = movie_for(barcode)
+        self.send_json(200, {'products': [
+            {'title': f"{title} ({format_type})", 'description': '', 'category': 'Media > Movies'}
+        ]})
+
+    def tmdb_search(self, title):
+        status = self.simulate('tmdb')
+        if status:
+            return self.send_json(status, {})
+        match = re.search(r'Benchmark Movie (\d+)', title)
+        if not match:
+            return self.send_json(200, {'results': []})
+        number = int(match.group(1))
+        self.send_json(200, {'results': [{
+            'id': number + 1,
+            'title': f"Benchmark Movie {number}",
+            'release_date': f"{1970 + number % 50}-01-01",
+            'poster_path': f"/stub{number}.jpg"
+        }]})
+
+    def tmdb_movie(self, movie_id):
+        status = self.simulate('tmdb')
+        if status:
+            return self.send_json(status, {})
+        self.send_json(200, {
+            'id': int(movie_id),
+            'genres': [{'id': 18, 'name': 'Drama'}],
+            'credits': {'crew': [{'job': 'Director', 'name': f"Director {movie_id}"}]}
+        })
+
+
+class StubServer:
+    """Threaded stub server; use as a context manager to run it in the background"""
+
+    def __init__(self, services=None, port=0, seed=0):
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', port), StubHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.services = {name: dict(settings) for name, settings in DEFAULT_SERVICES.items()}
+        for name, overrides in (services or {}).items():
+            self.httpd.services[name].update(overrides)
+        self.httpd.rng = random.Random(seed)
+        self.httpd.rng_lock = threading.Lock()
+        self.httpd.requests = {name: 0 for name in self.httpd.services}
+        self.thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    @property
+    def services(self):
+        return self.httpd.services
+
+    @property
+    def requests(self):
+        return dict(self.httpd.requests)
+
+    def environment(self):
+        """Environment variables that point the app at this server"""
+        return {
+            'UPCITEMDB_BASE_URL': self.url,
+            'OPENFOODFACTS_BASE_URL': self.url,
+            'BARCODE_LOOKUP_BASE_URL': self.url,
+            'BARCODE_LOOKUP_API_KEY': 'stub',
+            'TMDB_BASE_URL': f"{self.url}/3",
+            'TMDB_API_KEY': 'stub'
+        }
+
+    def __enter__(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the provider stub server')
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    server = StubServer(port=args.port, seed=args.seed)
+    print(f"Stub providers on {server.url}; point the app at it with:")
+    for key, value in server.environment().items():
+        print(f"  export {key}={value}")
+    server.httpd.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
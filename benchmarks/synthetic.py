@@ -0,0 +1,92 @@
+"""Synthetic barcode photos for decode benchmarks.
+
+Codes are rendered with python-barcode, scaled to a target width, pasted
+onto a larger grey "photo" and then degraded (rotation, blur, noise), so
+the ROI search and the fallback stages get exercised as they would by a
+phone camera. Everything is driven by a seed, so a run is reproducible.
+"""
+import itertools
+import random
+
+import cv2
+import numpy as np
+import barcode
+from barcode.writer import ImageWriter
+
+# Barcode width in pixels inside a 1600x1200 frame
+RESOLUTIONS = (240, 480, 960)
+BLUR_SIGMAS = (0, 1.5, 3.0)
+ROTATIONS = (0, 8, 20)
+NOISE_LEVELS = (0, 12, 25)
+
+FRAME_SIZE = (1200, 1600)  # height, width
+
+
+def random_codes(count, rng):
+    """(symbology, full code) pairs, alternating EAN-13 and UPC-A"""
+    codes = []
+    for index in range(count):
+        if index % 2 == 0:
+            symbol = barcode.get('ean13', ''.join(rng.choice('0123456789') for _ in range(12)))
+            codes.append(('ean13', symbol.get_fullcode()))
+        else:
+            symbol = barcode.get('upca', ''.join(rng.choice('0123456789') for _ in range(11)))
+            codes.append(('upca', symbol.get_fullcode()))
+    return codes
+
+
+def render_code(symbology, code):
+    """Clean grayscale rendering of a code, without the human-readable text"""
+    data = code[:12] if symbology == 'ean13' else code[:11]
+    image = barcode.get(symbology, data, writer=ImageWriter()).render(writer_options={
+        'module_width': 0.33,
+        'module_height': 20,
+        'dpi': 300,
+        'quiet_zone': 6.5,
+        'write_text': False
+    })
+    return np.array(image.convert('L'))
+
+
+def degrade(clean, width, blur, rotation, noise, rng):
+    """Place a rendered code in a frame and apply the given distortions"""
+    scale = width / clean.shape[1]
+    code = cv2.resize(clean, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+    frame = np.full(FRAME_SIZE, 150, dtype=np.uint8)
+    height = min(code.shape[0], FRAME_SIZE[0])
+    code = code[:height, :FRAME_SIZE[1]]
+    y = rng.randint(0, FRAME_SIZE[0] - code.shape[0])
+    x = rng.randint(0, FRAME_SIZE[1] - code.shape[1])
+    frame[y:y + code.shape[0], x:x + code.shape[1]] = code
+
+    if rotation:
+        matrix = cv2.getRotationMatrix2D((x + code.shape[1] / 2, y + code.shape[0] / 2), rotation, 1.0)
+        frame = cv2.warpAffine(frame, matrix, (FRAME_SIZE[1], FRAME_SIZE[0]), borderValue=150)
+    if blur:
+        frame = cv2.GaussianBlur(frame, (0, 0), blur)
+    if noise:
+        noise_rng = np.random.default_rng(rng.randrange(2 ** 32))
+        frame = np.clip(frame + noise_rng.normal(0, noise, frame.shape), 0, 255).astype(np.uint8)
+    return frame
+
+
+def cases(resolutions=RESOLUTIONS, blurs=BLUR_SIGMAS, rotations=ROTATIONS, noises=NOISE_LEVELS):
+    """Every combination of distortions as dicts"""
+    return [
+        {'width': width, 'blur': blur, 'rotation': rotation, 'noise': noise}
+        for width, blur, rotation, noise in itertools.product(resolutions, blurs, rotations, noises)
+    ]
+
+
+def generate(case_list, codes_per_case, seed=0):
+    """Yield (case, symbology, expected code, JPEG bytes) for every case"""
+    rng = random.Random(seed)
+    codes = random_codes(codes_per_case, rng)
+    clean = {code: render_code(symbology, code) for symbology, code in codes}
+
+    for case in case_list:
+        for symbology, code in codes:
+            frame = degrade(clean[code], case['width'], case['blur'], case['rotation'], case['noise'], rng)
+            ok, encoded = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 90])
+            yield case, symbology, code, encoded.tobytes()
@@ -0,0 +1,190 @@
+import csv
+import gzip
+import io
+import os
+import re
+import sqlite3
+import threading
+from urllib.parse import quote
+
+# Column names recognised in product dumps (first match wins)
+BARCODE_COLUMNS = ('upc', 'ean', 'barcode', 'gtin', 'code')
+TITLE_COLUMNS = ('title', 'product_name', 'name', 'description')
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS upc_catalogue (
+        barcode TEXT PRIMARY KEY,
+        title TEXT NOT NULL,
+        format_type TEXT,
+        year INTEGER
+    ) WITHOUT ROWID""",
+    """CREATE TABLE IF NOT EXISTS catalogue_info (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    )"""
+]
+
+# Keep the first title seen for a code, unless a later row also tells us the format
+UPSERT_SQL = """
+    INSERT INTO upc_catalogue (barcode, title, format_type, year) VALUES (?, ?, ?, ?)
+    ON CONFLICT(barcode) DO UPDATE SET title = excluded.title, format_type = excluded.format_type,
+        year = COALESCE(excluded.year, upc_catalogue.year)
+    WHERE upc_catalogue.format_type IS NULL AND excluded.format_type IS NOT NULL
+"""
+
+NON_DIGITS = re.compile(r'\D')
+
+
+def normalize_barcode(barcode):
+    """Canonical form used as the index key.
+
+    UPC-A codes are stored as their 13-digit EAN form (leading zero) and
+    zero-padded GTIN-14s are trimmed, so a case scanned as either UPC-A
+    or EAN-13 finds the same row.
+    """
+    code = NON_DIGITS.sub('', str(barcode or ''))
+    if len(code) == 14 and code.startswith('0'):
+        code = code[1:]
+    if len(code) == 12:
+        code = '0' + code
+    return code
+
+
+def open_dump(path):
+    """Open a CSV/TSV dump (optionally gzipped) as text"""
+    if path.endswith('.gz'):
+        return io.TextIOWrapper(gzip.open(path, 'rb'), encoding='utf-8', errors='replace', newline='')
+    return open(path, encoding='utf-8', errors='replace', newline='')
+
+
+def find_column(header, explicit, candidates):
+    names = [name.strip().lower() for name in header]
+    for name in ([explicit.lower()] if explicit else candidates):
+        if name in names:
+            return names.index(name)
+    raise ValueError(f"No {'/'.join([explicit] if explicit else candidates)} column in dump header")
+
+
+def iter_dump_rows(path, barcode_column=None, title_column=None):
+    """Stream (barcode, title) pairs from a dump without loading it into memory"""
+    csv.field_size_limit(1024 * 1024)
+    with open_dump(path) as dump:
+        header_line = dump.readline()
+        delimiter = '\t' if '\t' in header_line else ','
+        header = next(csv.reader([header_line], delimiter=delimiter))
+        barcode_index = find_column(header, barcode_column, BARCODE_COLUMNS)
+        title_index = find_column(header, title_column, TITLE_COLUMNS)
+
+        for row in csv.reader(dump, delimiter=delimiter):
+            if len(row) > max(barcode_index, title_index):
+                yield row[barcode_index], row[title_index]
+
+
+def build_catalogue(dump_path, catalogue_path, normalize_titles,
+                    barcode_column=None, title_column=None, media_only=False, batch_size=10000):
+    """Build the catalogue index from a dump.
+
+    Titles are cleaned and formats detected once here, a batch at a time
+    (normalize_titles maps product titles to [(clean title, format, year)]), so
+    lookups are a single primary-key read. The index is written to a temporary file and
+    swapped in when complete; open readers pick up the new file on their
+    next lookup. Returns (rows read, rows stored).
+    """
+    temporary = f"{catalogue_path}.{os.getpid()}.tmp"
+    if os.path.exists(temporary):
+        os.remove(temporary)
+
+    connection = sqlite3.connect(temporary)
+    read = 0
+    try:
+        connection.execute('PRAGMA journal_mode = OFF')
+        connection.execute('PRAGMA synchronous = OFF')
+        for statement in SCHEMA:
+            connection.execute(statement)
+
+        def store(batch):
+            normalized = normalize_titles([product_title.strip() for code, product_title in batch])
+            connection.executemany(UPSERT_SQL, [
+                (code, title, format_type, year)
+                for (code, product_title), (title, format_type, year) in zip(batch, normalized)
+                if title and len(title) >= 3 and not (media_only and format_type is None)
+            ])
+
+        batch = []
+        for barcode, product_title in iter_dump_rows(dump_path, barcode_column, title_column):
+            read += 1
+            code = normalize_barcode(barcode)
+            if len(code) < 8:
+                continue
+            batch.append((code, product_title))
+            if len(batch) >= batch_size:
+                store(batch)
+                batch = []
+        if batch:
+            store(batch)
+
+        stored = connection.execute('SELECT COUNT(*) FROM upc_catalogue').fetchone()[0]
+        connection.executemany('INSERT OR REPLACE INTO catalogue_info (key, value) VALUES (?, ?)', [
+            ('source', os.path.basename(dump_path)),
+            ('rows', str(stored))
+        ])
+        connection.commit()
+        connection.execute('VACUUM')
+    finally:
+        connection.close()
+
+    os.replace(temporary, catalogue_path)
+    return read, stored
+
+
+class UpcCatalogue:
+    """Read-only lookups against a catalogue built by build_catalogue.
+
+    Connections are opened lazily, one per thread, so nothing is loaded at
+    startup; SQLite memory-maps the file and only touches the pages a
+    lookup needs.
+    """
+
+    def __init__(self, path, mmap_size=256 * 1024 * 1024):
+        self.path = path
+        self.mmap_size = mmap_size
+        self._local = threading.local()
+
+    def _connection(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+
+        # Reopen when the file was replaced by a rebuild
+        identity = (stat.st_ino, stat.st_mtime_ns)
+        if getattr(self._local, 'identity', None) != identity:
+            if getattr(self._local, 'connection', None) is not None:
+                self._local.connection.close()
+            connection = sqlite3.connect(f"file:{quote(os.path.abspath(self.path))}?mode=ro", uri=True)
+            connection.execute(f'PRAGMA mmap_size = {int(self.mmap_size)}')
+            self._local.connection = connection
+            self._local.identity = identity
+            # Catalogues built before release years were stored have no year column
+            columns = [row[1] for row in connection.execute('PRAGMA table_info(upc_catalogue)')]
+            self._local.select = ('SELECT title, format_type, {} FROM upc_catalogue WHERE barcode = ?'
+                                  .format('year' if 'year' in columns else 'NULL'))
+        return self._local.connection
+
+    def lookup(self, barcode):
+        """Return {'title', 'format_type', 'year'} for a barcode, or None"""
+        connection = self._connection()
+        if connection is None:
+            return None
+
+        row = connection.execute(self._local.select, (normalize_barcode(barcode),)).fetchone()
+        if row is None:
+            return None
+        return {'title': row[0], 'format_type': row[1], 'year': row[2]}
+
+    def info(self):
+        """Details of the loaded dump ({'source', 'rows'}), or {} when there is no catalogue"""
+        connection = self._connection()
+        if connection is None:
+            return {}
+        return dict(connection.execute('SELECT key, value FROM catalogue_info'))
@@ -0,0 +1,235 @@
+import time
+
+import cv2
+import numpy as np
+from pyzbar import pyzbar
+from pyzbar.pyzbar import ZBarSymbol
+
+# Symbologies printed on retail disc cases. Early stages only look for
+# these, which is both faster and less prone to false positives. Asking
+# for UPCA makes zbar report UPC-A codes as 12 digits; scan() turns them
+# back into the EAN-13 form zbar reports by default.
+RETAIL_SYMBOLS = [ZBarSymbol.EAN13, ZBarSymbol.UPCA, ZBarSymbol.EAN8, ZBarSymbol.UPCE]
+
+# Working size (longest side, pixels) for the cheap early stages
+FAST_DIMENSION = 960
+
+# Small tilts zbar struggles with; larger angles are handled by zbar itself
+ROTATION_ANGLES = [12, -12, 25, -25]
+
+# Cheap stages used for live video, where the next frame is a better
+# retry than the expensive fallbacks
+STREAM_STAGES = ('roi', 'downscaled', 'equalized')
+
+
+def has_valid_checksum(code, symbol_type):
+    """Check the mod-10 check digit of EAN-13/UPC-A/EAN-8 codes.
+
+    Other symbologies carry no check digit we can verify here and are
+    accepted as read.
+    """
+    if symbol_type not in ('EAN13', 'UPCA', 'EAN8'):
+        return bool(code)
+
+    if not code.isdigit() or len(code) not in (8, 12, 13):
+        return False
+
+    digits = [int(digit) for digit in code]
+    check = digits.pop()
+    # Weights alternate 3,1,3,... starting from the digit next to the check digit
+    total = sum(digit * (3 if index % 2 == 0 else 1) for index, digit in enumerate(reversed(digits)))
+    return (10 - total % 10) % 10 == check
+
+
+def resize_to(image, max_dimension):
+    """Downscale so the longest side is at most max_dimension"""
+    if not max_dimension:
+        return image
+
+    height, width = image.shape[:2]
+    scale = max_dimension / float(max(height, width))
+    if scale >= 1:
+        return image
+    return cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+
+def find_barcode_roi(gray, padding=0.08):
+    """Locate the most barcode-like region using the horizontal gradient.
+
+    1D barcodes have strong horizontal and weak vertical gradients; after
+    blurring, thresholding and closing the gaps between bars the largest
+    blob is usually the barcode. Returns a crop, or None if nothing
+    plausible was found.
+    """
+    small = resize_to(gray, 640)
+    ratio = gray.shape[1] / float(small.shape[1])
+
+    grad_x = cv2.Sobel(small, cv2.CV_32F, 1, 0, ksize=-1)
+    grad_y = cv2.Sobel(small, cv2.CV_32F, 0, 1, ksize=-1)
+    gradient = cv2.convertScaleAbs(cv2.subtract(np.abs(grad_x), np.abs(grad_y)))
+
+    blurred = cv2.blur(gradient, (9, 9))
+    _, thresh = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (21, 7))
+    closed = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, kernel)
+    closed = cv2.erode(closed, None, iterations=4)
+    closed = cv2.dilate(closed, None, iterations=4)
+
+    contours, _ = cv2.findContours(closed, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return None
+
+    x, y, width, height = cv2.boundingRect(max(contours, key=cv2.contourArea))
+    if width * height < 0.005 * small.shape[0] * small.shape[1]:
+        return None
+
+    # Back to full-resolution coordinates, with some quiet zone around the bars
+    pad_x, pad_y = int(width * padding * ratio) + 8, int(height * padding * ratio) + 8
+    x0 = max(int(x * ratio) - pad_x, 0)
+    y0 = max(int(y * ratio) - pad_y, 0)
+    x1 = min(int((x + width) * ratio) + pad_x, gray.shape[1])
+    y1 = min(int((y + height) * ratio) + pad_y, gray.shape[0])
+    return gray[y0:y1, x0:x1]
+
+
+def rotate(image, angle):
+    """Rotate around the centre, growing the canvas so corners are kept"""
+    height, width = image.shape[:2]
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+    cos, sin = abs(matrix[0, 0]), abs(matrix[0, 1])
+    new_width, new_height = int(height * sin + width * cos), int(height * cos + width * sin)
+    matrix[0, 2] += new_width / 2 - width / 2
+    matrix[1, 2] += new_height / 2 - height / 2
+    return cv2.warpAffine(image, matrix, (new_width, new_height), borderValue=255)
+
+
+def equalize(image):
+    clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
+    return clahe.apply(image)
+
+
+def adaptive_threshold(image):
+    return cv2.adaptiveThreshold(image, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 10)
+
+
+def build_stages(gray):
+    """Decode attempts in increasing cost: (name, image factory, symbols).
+
+    Images are produced lazily so work for later stages is only done when
+    the cheaper ones miss.
+    """
+    cache = {}
+
+    def roi():
+        if 'roi' not in cache:
+            crop = find_barcode_roi(gray)
+            cache['roi'] = resize_to(crop, FAST_DIMENSION) if crop is not None else None
+        return cache['roi']
+
+    def working():
+        # ROI when we found one, otherwise the downscaled frame
+        crop = roi()
+        return crop if crop is not None else resize_to(gray, FAST_DIMENSION)
+
+    stages = [
+        ('roi', lambda: [roi()] if roi() is not None else [], RETAIL_SYMBOLS),
+        ('downscaled', lambda: [resize_to(gray, FAST_DIMENSION)], RETAIL_SYMBOLS),
+        ('equalized', lambda: [equalize(working())], RETAIL_SYMBOLS),
+        ('threshold', lambda: [adaptive_threshold(equalize(working()))], RETAIL_SYMBOLS),
+        ('rotated', lambda: [rotate(working(), angle) for angle in ROTATION_ANGLES], RETAIL_SYMBOLS),
+        ('full_resolution', lambda: [gray], None)
+    ]
+    return stages
+
+
+def scan(image, symbols=None):
+    """Run zbar on a single grayscale image, returning [{'data', 'type'}].
+
+    UPC-A codes come back as 13-digit EAN-13 (leading zero) whichever
+    symbols were asked for, so every stage reports a case the same way.
+    """
+    results = []
+    for barcode in pyzbar.decode(image, symbols=symbols):
+        data, symbol_type = barcode.data.decode('utf-8'), barcode.type
+        if symbol_type == 'UPCA' and len(data) == 12:
+            data, symbol_type = '0' + data, 'EAN13'
+        results.append({
+            'data': data,
+            'type': symbol_type
+        })
+    return results
+
+
+def decode_image(gray, stop_early=True, only_stages=None):
+    """Run the staged decode pipeline on a grayscale frame.
+
+    Returns (barcodes, stages) where stages lists the name, elapsed
+    milliseconds and number of codes found for every stage that ran.
+    Stops after the first stage yielding a checksum-valid code, unless
+    stop_early is False (used to collect every code in shelf photos).
+    only_stages limits the run to the named stages.
+    """
+    found = {}
+    timings = []
+
+    for name, make_images, symbols in build_stages(gray):
+        if only_stages is not None and name not in only_stages:
+            continue
+        started = time.perf_counter()
+        hits = 0
+        for image in make_images():
+            for barcode in scan(image, symbols):
+                if has_valid_checksum(barcode['data'], barcode['type']):
+                    hits += 1
+                    found.setdefault(barcode['data'], barcode)
+        timings.append({
+            'stage': name,
+            'ms': round((time.perf_counter() - started) * 1000, 2),
+            'found': hits
+        })
+
+        if found and stop_early:
+            break
+
+    return list(found.values()), timings
+
+
+def decode_bytes(image_bytes, max_dimension=None, stop_early=True, only_stages=None):
+    """Decode barcodes from encoded image bytes (JPEG/PNG/...).
+
+    Returns (barcodes, stages); raises ValueError for unreadable images.
+    """
+    started = time.perf_counter()
+
+    # Decode straight to grayscale; zbar only looks at luminance
+    buffer = np.frombuffer(image_bytes, dtype=np.uint8)
+    gray = cv2.imdecode(buffer, cv2.IMREAD_GRAYSCALE)
+    if gray is None:
+        raise ValueError('Unreadable image data')
+
+    # Optionally shrink very large frames before scanning
+    gray = resize_to(gray, max_dimension)
+
+    timings = [{'stage': 'image_decode', 'ms': round((time.perf_counter() - started) * 1000, 2), 'found': 0}]
+    barcodes, stages = decode_image(gray, stop_early=stop_early, only_stages=only_stages)
+    return barcodes, timings + stages
+
+
+def decode_file(name, image_bytes, max_dimension=None):
+    """Decode every barcode in one image; safe to run in a worker process.
+
+    Runs all stages (no early exit) so shelf photos with several cases
+    report every code. Errors are returned rather than raised so one bad
+    file does not abort a batch.
+    """
+    started = time.perf_counter()
+    try:
+        barcodes, stages = decode_bytes(image_bytes, max_dimension, stop_early=False)
+        return {
+            'image': name,
+            'barcodes': barcodes,
+            'ms': round((time.perf_counter() - started) * 1000, 2)
+        }
+    except Exception as e:
+        return {'image': name, 'barcodes': [], 'error': str(e)}
@@ -0,0 +1,24 @@
+"""gunicorn settings: gunicorn --config gunicorn.conf.py"""
+import os
+
+wsgi_app = 'app:create_app()'
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+
+# Threaded workers: lookups mostly wait on the network, and each open scan
+# WebSocket holds a thread for as long as the camera is running
+worker_class = 'gthread'
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+
+# Import the app (and prepare the database) once in the master; workers
+# fork from it. OpenCV and pyzbar are not part of this - each worker loads
+# them on its first scan.
+preload_app = True
+
+# Batch scans and uploads of large archives can take a while
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = '-'
+errorlog = '-'
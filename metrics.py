@@ -0,0 +1,151 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Latency buckets (seconds) shared by every histogram
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# Spans recorded while handling the current request, as [(name, seconds)].
+# Copy the context into worker threads (contextvars.copy_context().run) to
+# have their spans land in the same list.
+current_trace = ContextVar('current_trace', default=None)
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in pairs) + '}'
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self.lock:
+            for key, value in sorted(self.values.items()):
+                lines.append(f'{self.name}{format_labels(self.labels, key)} {value}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.values = {}  # label values -> [bucket counts..., sum, count]
+        self.lock = threading.Lock()
+
+    def observe(self, seconds, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labels)
+        with self.lock:
+            entry = self.values.get(key)
+            if entry is None:
+                entry = self.values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    entry[index] += 1
+            entry[-2] += seconds
+            entry[-1] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self.lock:
+            for key, entry in sorted(self.values.items()):
+                for bound, count in zip(self.buckets, entry):
+                    lines.append(f'{self.name}_bucket{format_labels(self.labels, key, [("le", bound)])} {count}')
+                lines.append(f'{self.name}_bucket{format_labels(self.labels, key, [("le", "+Inf")])} {entry[-1]}')
+                lines.append(f'{self.name}_sum{format_labels(self.labels, key)} {entry[-2]:.6f}')
+                lines.append(f'{self.name}_count{format_labels(self.labels, key)} {entry[-1]}')
+        return lines
+
+
+class CallbackMetric:
+    """Counter or gauge read from a function returning {label values: value} when scraped"""
+
+    def __init__(self, name, help, labels=(), callback=None, type='gauge'):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.callback = callback
+        self.type = type
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.type}']
+        for key, value in sorted(self.callback().items()):
+            lines.append(f'{self.name}{format_labels(self.labels, key)} {value}')
+        return lines
+
+
+class Registry:
+    """In-process metrics rendered in the Prometheus text format.
+
+    Values are per process; with several server worker processes each
+    one reports its own.
+    """
+
+    def __init__(self, prefix=''):
+        self.prefix = prefix
+        self.metrics = []
+
+    def add(self, metric):
+        metric.name = self.prefix + metric.name
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labels=()):
+        return self.add(Counter(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        return self.add(Histogram(name, help, labels, buckets))
+
+    def callback(self, name, help, labels=(), callback=None, type='gauge'):
+        return self.add(CallbackMetric(name, help, labels, callback, type))
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+def start_trace():
+    trace = []
+    current_trace.set(trace)
+    return trace
+
+
+def record_span(name, seconds, histogram=None, **labels):
+    """Record an already measured span in the histogram and the current trace"""
+    if histogram is not None:
+        histogram.observe(seconds, **labels)
+    trace = current_trace.get()
+    if trace is not None:
+        trace.append((name, seconds))
+
+
+@contextmanager
+def span(name, histogram=None, **labels):
+    """Time a block of code as a span"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(name, time.perf_counter() - started, histogram, **labels)
@@ -0,0 +1,79 @@
+import hashlib
+import importlib.util
+import os
+import threading
+from io import BytesIO
+from urllib.parse import urlparse
+
+import requests
+
+# Generated sizes: name -> target width in pixels
+POSTER_SIZES = {
+    'thumb': 300,   # collection grid/list
+    'medium': 500   # detail modal and scan results
+}
+
+# WebP when this Pillow build supports it, JPEG otherwise. Checked without
+# importing PIL.Image, which is only loaded once a poster is mirrored.
+if importlib.util.find_spec('PIL._webp') is not None:
+    POSTER_EXTENSION, POSTER_FORMAT, POSTER_OPTIONS = 'webp', 'WEBP', {'quality': 80, 'method': 4}
+else:
+    POSTER_EXTENSION, POSTER_FORMAT, POSTER_OPTIONS = 'jpg', 'JPEG', {'quality': 82, 'optimize': True, 'progressive': True}
+
+
+def poster_key(poster_url):
+    """Stable key for a source URL; movies sharing a poster share the files"""
+    return hashlib.sha1(poster_url.encode('utf-8')).hexdigest()[:20]
+
+
+def poster_path(folder, key, size):
+    return os.path.join(folder, key, f"{size}.{POSTER_EXTENSION}")
+
+
+def is_allowed_source(poster_url, hosts):
+    """Whether poster_url is an https URL on one of hosts"""
+    url = urlparse(poster_url or '')
+    return url.scheme == 'https' and url.hostname in hosts
+
+
+def has_poster(folder, key):
+    return all(os.path.exists(poster_path(folder, key, size)) for size in POSTER_SIZES)
+
+
+def mirror_poster(poster_url, folder, session=None, timeout=15, force=False, allowed_hosts=None):
+    """Download a poster once and write every size under folder/<key>/.
+
+    Returns the key. Existing files are reused, so calling this again for
+    the same URL does not hit the network, unless force is set. With
+    allowed_hosts, other URLs raise ValueError instead of being fetched;
+    redirects are never followed.
+    """
+    if allowed_hosts is not None and not is_allowed_source(poster_url, allowed_hosts):
+        raise ValueError(f"Poster URL not on an allowed host: {poster_url}")
+
+    key = poster_key(poster_url)
+    if has_poster(folder, key) and not force:
+        return key
+
+    from PIL import Image
+
+    response = (session or requests).get(poster_url, timeout=timeout, allow_redirects=False)
+    response.raise_for_status()
+    if response.is_redirect:
+        raise ValueError(f"Poster URL redirects elsewhere: {poster_url}")
+
+    image = Image.open(BytesIO(response.content))
+    image = image.convert('RGB')
+
+    os.makedirs(os.path.join(folder, key), exist_ok=True)
+    for size, width in POSTER_SIZES.items():
+        resized = image.copy()
+        resized.thumbnail((width, width * 3), Image.LANCZOS)
+
+        # Write to a temporary name first so readers never see partial files
+        path = poster_path(folder, key, size)
+        temporary = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+        resized.save(temporary, POSTER_FORMAT, **POSTER_OPTIONS)
+        os.replace(temporary, path)
+
+    return key
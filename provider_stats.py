@@ -0,0 +1,135 @@
+import threading
+import time
+from collections import deque
+
+
+class CircuitBreaker:
+    """Skips a provider for a cool-down period after repeated failures.
+
+    closed: calls go through. open: calls are refused until the cool-down
+    ends. half_open: the cool-down has ended and one probe call is let
+    through; its outcome closes the breaker again or re-opens it.
+    """
+
+    def __init__(self, failure_threshold=3, cooldown=60):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.open_until = None
+        self.probing = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self.lock:
+            if self.open_until is None:
+                return 'closed'
+            if self.probing or time.monotonic() < self.open_until:
+                return 'open'
+            return 'half_open'
+
+    def retry_after(self):
+        """Seconds until the breaker lets a call through (0 when closed)"""
+        with self.lock:
+            if self.open_until is None:
+                return 0.0
+            return max(self.open_until - time.monotonic(), 0.0)
+
+    def allow(self):
+        """Whether a call may go ahead now; claims the probe when half-open"""
+        with self.lock:
+            if self.open_until is None:
+                return True
+            if self.probing or time.monotonic() < self.open_until:
+                return False
+            # Hold other callers back while the probe is in flight
+            self.probing = True
+            self.open_until = time.monotonic() + self.cooldown
+            return True
+
+    def release(self):
+        """Give back a claimed probe that was never made (e.g. no request budget)"""
+        with self.lock:
+            self.probing = False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.open_until = None
+            self.probing = False
+
+    def record_failure(self, retry_after=None):
+        """Count a failure; retry_after (e.g. from a quota response) opens the breaker at once"""
+        with self.lock:
+            self.failures += 1
+            if self.probing or retry_after is not None or self.failures >= self.failure_threshold:
+                self.open_until = time.monotonic() + max(self.cooldown, retry_after or 0)
+                self.probing = False
+
+    def reset(self):
+        self.record_success()
+
+
+class ProviderStats:
+    """Rolling latency and outcome statistics for one barcode provider.
+
+    Keeps the last `window` calls as (time, seconds, outcome), where the
+    outcome is 'hit' (valid product), 'miss', 'error' or 'quota'.
+    """
+
+    def __init__(self, name, window=200, breaker=None):
+        self.name = name
+        self.samples = deque(maxlen=window)
+        self.recent_errors = deque(maxlen=10)
+        self.breaker = breaker or CircuitBreaker()
+        self.lock = threading.Lock()
+
+    def record(self, seconds, outcome, error=None):
+        with self.lock:
+            self.samples.append((time.time(), seconds, outcome))
+            if error:
+                self.recent_errors.append((time.time(), outcome, str(error)))
+
+    def summary(self):
+        """Counts, rates and latency percentiles over the current window"""
+        with self.lock:
+            samples = list(self.samples)
+            errors = list(self.recent_errors)
+
+        calls = len(samples)
+        answered = [sample for sample in samples if sample[2] in ('hit', 'miss')]
+        hits = sum(1 for sample in answered if sample[2] == 'hit')
+        latencies = sorted(sample[1] for sample in samples)
+
+        def percentile(fraction):
+            if not latencies:
+                return None
+            return latencies[min(int(fraction * len(latencies)), len(latencies) - 1)]
+
+        return {
+            'calls': calls,
+            'hits': hits,
+            'errors': sum(1 for sample in samples if sample[2] == 'error'),
+            'quota': sum(1 for sample in samples if sample[2] == 'quota'),
+            'success_rate': len(answered) / calls if calls else None,
+            'hit_rate': hits / len(answered) if answered else None,
+            'p50': percentile(0.5),
+            'p95': percentile(0.95),
+            'recent_errors': [
+                {'at': at, 'outcome': outcome, 'error': message}
+                for at, outcome, message in reversed(errors)
+            ]
+        }
+
+    def score(self):
+        """Expected hits per second of waiting; higher is tried first.
+
+        Rates are smoothed (one hit in two calls, one second per call) so
+        providers without history keep a neutral score and their static
+        position, and a few lucky calls do not reorder the chain.
+        """
+        summary = self.summary()
+        calls = summary['calls']
+        hit_rate = (summary['hits'] + 1) / (calls + 2)
+        latency = ((summary['p50'] or 0) * calls + 1.0) / (calls + 1)
+        return hit_rate / max(latency, 0.001)
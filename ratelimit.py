@@ -0,0 +1,108 @@
+import os
+import sqlite3
+import threading
+import time
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, up to `capacity` banked"""
+
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self):
+        """Take a token if one is available right now"""
+        with self.lock:
+            self._refill(time.monotonic())
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+    def wait_time(self):
+        """Seconds until the next token is available (0 if one is available now)"""
+        with self.lock:
+            self._refill(time.monotonic())
+            if self.tokens >= 1:
+                return 0.0
+            return (1 - self.tokens) / self.rate if self.rate > 0 else float('inf')
+
+    def acquire(self, timeout=None):
+        """Take a token, waiting up to `timeout` seconds (None waits forever)"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if self.try_acquire():
+                return True
+
+            wait = self.wait_time()
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or wait > remaining:
+                    return False
+            time.sleep(min(max(wait, 0.01), 1.0))
+
+
+class SharedTokenBucket(TokenBucket):
+    """Token bucket kept in a SQLite file, shared by every process using the same path.
+
+    Tokens are taken with one conditional UPDATE, so several gunicorn
+    workers (each with its own lookup and import threads) draw on a single
+    budget instead of one each.
+    """
+
+    REFILLED = 'MIN(:capacity, tokens + MAX(:now - updated, 0) * :rate)'
+
+    def __init__(self, rate, capacity, path, name):
+        super().__init__(rate, capacity)
+        self.path = path
+        self.name = name
+        self._local = threading.local()
+        self._execute('CREATE TABLE IF NOT EXISTS token_bucket '
+                      '(name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)')
+        self._execute('INSERT OR IGNORE INTO token_bucket (name, tokens, updated) VALUES (:name, :capacity, :now)')
+
+    def _execute(self, sql):
+        # A forked worker (gunicorn preload) must not reuse its parent's connection
+        if getattr(self._local, 'pid', None) != os.getpid():
+            # Autocommit: every statement is its own atomic transaction
+            self._local.connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            self._local.connection.execute('PRAGMA journal_mode = WAL')
+            self._local.pid = os.getpid()
+        connection = self._local.connection
+        return connection.execute(sql, {'name': self.name, 'capacity': self.capacity, 'rate': self.rate,
+                                        'now': time.time()})
+
+    def try_acquire(self):
+        """Take a token if one is available right now"""
+        cursor = self._execute(f'UPDATE token_bucket SET tokens = {self.REFILLED} - 1, updated = :now '
+                               f'WHERE name = :name AND {self.REFILLED} >= 1')
+        return cursor.rowcount == 1
+
+    def wait_time(self):
+        """Seconds until the next token is available (0 if one is available now)"""
+        row = self._execute(f'SELECT {self.REFILLED} FROM token_bucket WHERE name = :name').fetchone()
+        tokens = row[0] if row else self.capacity
+        if tokens >= 1:
+            return 0.0
+        return (1 - tokens) / self.rate if self.rate > 0 else float('inf')
+
+
+def parse_rate_limit(value, shared_path=None, name=None):
+    """Parse "requests/seconds/burst" (burst optional) into a TokenBucket.
+
+    With shared_path the bucket is a SharedTokenBucket stored there under name.
+    """
+    parts = [float(part) for part in value.split('/')]
+    requests, seconds = parts[0], parts[1]
+    burst = parts[2] if len(parts) > 2 else max(requests, 1)
+    if shared_path:
+        return SharedTokenBucket(requests / seconds, burst, shared_path, name)
+    return TokenBucket(requests / seconds, burst)
@@ -0,0 +1,234 @@
+"""Product title normalization and a fuzzy title index.
+
+Provider titles ("The Matrix (1999) [Blu-ray] Special Edition") are cleaned
+with one precompiled regex pass instead of a chain of str.replace calls,
+and a bracketed release year is picked out. TitleIndex matches cleaned titles
+against movies we already know (the collection, earlier TMDb results) by
+trigram similarity, so a close match needs no TMDb search.
+"""
+import math
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+
+# Removed from product titles. Matching is case-sensitive and the longest
+# phrase wins at each position, as with the replace chain this came from.
+TITLE_NOISE = [
+    '[DVD]', '[Blu-ray]', '[4K]', '[Ultra HD]', '[UHD]',
+    '(DVD)', '(Blu-ray)', '(4K)', '(Ultra HD)', '(UHD)',
+    'DVD', 'Blu-ray', 'BluRay', '4K UHD', 'Ultra HD',
+    '- Special Edition', '- Director\'s Cut', '- Extended Edition',
+    'Special Edition', 'Director\'s Cut', 'Extended Edition',
+    '(Widescreen)', '(Full Screen)', 'Widescreen', 'Full Screen',
+    '- Collector\'s Edition', 'Collector\'s Edition', 'Deluxe Edition',
+    '[Region 1]', '[Region 2]', '[Region 4]', '(Region 1)', '(Region 2)', '(Region 4)'
+]
+
+# A release year in brackets: "Alien (1979) [Blu-ray]". Bare numbers are left
+# alone, they are often part of the title ("2001: A Space Odyssey", "1917").
+YEAR_PATTERN = r'\s*[\(\[]((?:18|19|20)\d{2})[\)\]]'
+RELEASE_YEAR = re.compile(YEAR_PATTERN)
+
+NOISE_PATTERN = re.compile('|'.join(
+    [re.escape(phrase) for phrase in sorted(TITLE_NOISE, key=len, reverse=True)] + [YEAR_PATTERN]
+))
+
+# Format and edition words, in any case, are left out when comparing titles
+KEY_NOISE_PATTERN = re.compile('|'.join(
+    [re.escape(phrase) for phrase in sorted(TITLE_NOISE, key=len, reverse=True)]
+    + [r'\b(?:4k|uhd|ultra hd|blu[- ]?ray|dvd|edition|region \d)\b']
+), re.IGNORECASE)
+
+# Sequel markers have to agree for two titles to match ("Rocky II" is not "Rocky III")
+SEQUEL_TOKEN = re.compile(r'^(?:\d+|[ivx]+)$')
+ARTICLES = ('the ', 'a ', 'an ')
+
+
+def clean_title(title):
+    """Remove format and edition phrases, and a bracketed year, from a product title"""
+    if not title:
+        return title
+    return NOISE_PATTERN.sub('', title).replace('  ', ' ').strip(' -,.')
+
+
+def detect_format(title):
+    """Disc format named in a product title, or None"""
+    if not title:
+        return None
+
+    # Substring checks on one lowered copy measure faster than a single
+    # regex here (see benchmarks/bench_titles.py). A "4K Ultra HD + Blu-ray"
+    # combo pack is 4K.
+    title_lower = title.lower()
+    if '4k' in title_lower or 'ultra hd' in title_lower or 'uhd' in title_lower:
+        return '4K Blu-ray'
+    if 'blu-ray' in title_lower or 'blu ray' in title_lower or 'bluray' in title_lower:
+        return 'Blu-ray'
+    if 'dvd' in title_lower:
+        return 'DVD'
+    return None
+
+
+def release_year(title):
+    """Release year given in brackets in a product title, or None"""
+    match = RELEASE_YEAR.search(title or '')
+    return int(match.group(1)) if match else None
+
+
+def normalize_titles(titles):
+    """Batch form for bulk imports: [(clean title, format, year)] in input order.
+
+    Product dumps repeat titles a lot (one per barcode, region and
+    edition), so each distinct title is only processed once.
+    """
+    seen = {}
+    results = []
+    for title in titles:
+        result = seen.get(title)
+        if result is None:
+            result = seen[title] = (clean_title(title), detect_format(title), release_year(title))
+        results.append(result)
+    return results
+
+
+def match_key(title):
+    """Loose form for comparing titles: no accents, case, punctuation or leading article"""
+    if not title:
+        return ''
+    text = unicodedata.normalize('NFKD', KEY_NOISE_PATTERN.sub(' ', title))
+    text = ''.join(char for char in text if not unicodedata.combining(char)).lower().replace('&', ' and ')
+    text = ' '.join(re.findall(r'[a-z0-9]+', text))
+    for article in ARTICLES:
+        if text.startswith(article):
+            return text[len(article):]
+    return text
+
+
+def trigrams(key):
+    padded = f"  {key} "
+    return {padded[index:index + 3] for index in range(len(padded) - 2)}
+
+
+def sequel_tokens(key):
+    return {token for token in key.split() if SEQUEL_TOKEN.match(token)}
+
+
+class TitleIndex:
+    """In-memory trigram index from titles to arbitrary payloads.
+
+    Entries are keyed by an id chosen by the caller, so they can be
+    replaced or removed as the source changes, and carry a group (e.g. the
+    TMDb id) naming the film they are; a title that matches two different
+    films equally well is ambiguous and not matched. Entries added with
+    bounded=True (e.g. cached search results) are evicted oldest first
+    beyond max_bounded. Safe to use from several threads.
+    """
+
+    def __init__(self, threshold=0.85, max_bounded=5000):
+        self.threshold = threshold
+        self.max_bounded = max_bounded
+        self.lock = threading.Lock()
+        self.entries = {}  # entry id -> (key, trigrams, year, group, payload)
+        self.exact = {}  # key -> set of entry ids
+        self.postings = {}  # trigram -> set of entry ids
+        self.bounded = OrderedDict()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, entry_id, title, year, group, payload, bounded=False):
+        key = match_key(title)
+        if not key:
+            return
+        with self.lock:
+            self._remove(entry_id)
+            grams = trigrams(key)
+            self.entries[entry_id] = (key, grams, year, group, payload)
+            self.exact.setdefault(key, set()).add(entry_id)
+            for gram in grams:
+                self.postings.setdefault(gram, set()).add(entry_id)
+            if bounded:
+                self.bounded[entry_id] = None
+                while len(self.bounded) > self.max_bounded:
+                    self._remove(next(iter(self.bounded)))
+
+    def remove(self, entry_id):
+        with self.lock:
+            self._remove(entry_id)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.exact.clear()
+            self.postings.clear()
+            self.bounded.clear()
+
+    def _remove(self, entry_id):
+        entry = self.entries.pop(entry_id, None)
+        if entry is None:
+            return
+        self.bounded.pop(entry_id, None)
+        key, grams = entry[0], entry[1]
+        self.exact[key].discard(entry_id)
+        if not self.exact[key]:
+            del self.exact[key]
+        for gram in grams:
+            self.postings[gram].discard(entry_id)
+            if not self.postings[gram]:
+                del self.postings[gram]
+
+    def lookup(self, title, year=None, group=None):
+        """Best (payload, score) at or above the threshold, or None.
+
+        With a year, only entries with a year within one of it can match;
+        with a group, only entries of that group.
+        """
+        key = match_key(title)
+        if not key:
+            return None
+        grams = trigrams(key)
+        sequels = sequel_tokens(key)
+        words = len(key.split())
+
+        with self.lock:
+            candidates = self.exact.get(key)
+            if not candidates:
+                # A match shares at least min_common trigrams with the query,
+                # so it has to contain one of its rarest len - min_common + 1
+                min_common = math.ceil(self.threshold / (2 - self.threshold) * len(grams))
+                rarest = sorted(grams, key=lambda gram: len(self.postings.get(gram, ())))
+                candidates = set()
+                for gram in rarest[:len(grams) - min_common + 1]:
+                    candidates.update(self.postings.get(gram, ()))
+
+            # Dice >= threshold also bounds the other title's trigram count
+            low = self.threshold / (2 - self.threshold) * len(grams)
+            high = (2 - self.threshold) / self.threshold * len(grams)
+
+            matches = []
+            for entry_id in candidates:
+                entry_key, entry_grams, entry_year, entry_group, payload = self.entries[entry_id]
+                if group is not None and entry_group != group:
+                    continue
+                if not low <= len(entry_grams) <= high:
+                    continue
+                # Dice coefficient over trigram sets
+                score = round(2 * len(grams & entry_grams) / (len(grams) + len(entry_grams)), 3)
+                if score < self.threshold or sequel_tokens(entry_key) != sequels:
+                    continue
+                # Near-misses should be typos or accents; an extra or missing word
+                # ("Alien" and "Alien Resurrection") is a different film
+                if len(entry_key.split()) != words:
+                    continue
+                if year and (not entry_year or abs(int(year) - int(entry_year)) > 1):
+                    continue
+                matches.append((score, entry_group, payload))
+
+        if not matches:
+            return None
+        best_score = max(score for score, group, payload in matches)
+        best = [(group, payload) for score, group, payload in matches if score == best_score]
+        if len({group for group, payload in best}) > 1:
+            return None
+        return best[0][1], best_score
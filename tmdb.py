@@ -0,0 +1,126 @@
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class TMDbRateLimited(Exception):
+    """No request token became available within the caller's wait"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"TMDb request budget exhausted, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class TMDbClient:
+    """Small TMDb API client sharing one pooled keep-alive session.
+
+    Movie details are fetched together with credits (append_to_response)
+    and kept in a local LRU cache keyed by TMDb id.
+    """
+
+    def __init__(self, api_key, base_url='https://api.themoviedb.org/3',
+                 language='en-US', timeout=10, pool_size=10, retries=3,
+                 backoff=0.5, cache_size=2000, cache_ttl=7 * 24 * 3600,
+                 rate_limiter=None, on_request=None):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.language = language
+        self.timeout = timeout
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.rate_limiter = rate_limiter  # optional TokenBucket, waited on before each request
+        self.on_request = on_request  # optional callback(endpoint, seconds) after each request
+
+        # Retry connection errors, rate limiting and transient server errors
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=['GET'],
+            respect_retry_after_header=True
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({'User-Agent': 'MovieScanner/1.0', 'Accept': 'application/json'})
+
+        self._cache = OrderedDict()  # tmdb_id -> (fetched_at, details)
+        self._cache_lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def _get(self, path, rate_wait=None, **params):
+        """GET a TMDb endpoint; rate_wait bounds the wait for a request token (None waits as long as it takes)"""
+        params.setdefault('api_key', self.api_key)
+        params.setdefault('language', self.language)
+
+        if self.rate_limiter is not None and not self.rate_limiter.acquire(timeout=rate_wait):
+            raise TMDbRateLimited(self.rate_limiter.wait_time())
+
+        started = time.perf_counter()
+        try:
+            response = self.session.get(f"{self.base_url}{path}", params=params, timeout=self.timeout)
+            response.raise_for_status()
+            return response.json()
+        finally:
+            if self.on_request is not None:
+                # '/search/movie' -> 'search', '/movie/603' -> 'movie'
+                self.on_request(path.strip('/').split('/')[0], time.perf_counter() - started)
+
+    def search(self, title, year=None, rate_wait=None):
+        """Return TMDb search results for a title, best match first"""
+        params = {'query': title}
+        if year:
+            params['year'] = year
+        return self._get('/search/movie', rate_wait=rate_wait, **params).get('results') or []
+
+    def get_movie(self, tmdb_id, rate_wait=None):
+        """Return movie details with credits, served from the local cache when fresh"""
+        tmdb_id = str(tmdb_id)
+
+        cached = self._cache_get(tmdb_id)
+        if cached is not None:
+            return cached
+
+        details = self._get(f"/movie/{tmdb_id}", rate_wait=rate_wait, append_to_response='credits')
+
+        # Only the crew is used; cast lists are large and not worth caching
+        if details.get('credits'):
+            details['credits'] = {'crew': details['credits'].get('crew', [])}
+
+        self._cache_put(tmdb_id, details)
+        return details
+
+    def _cache_get(self, tmdb_id):
+        with self._cache_lock:
+            entry = self._cache.get(tmdb_id)
+            if entry is None:
+                self.cache_misses += 1
+                return None
+
+            fetched_at, details = entry
+            if time.monotonic() - fetched_at > self.cache_ttl:
+                del self._cache[tmdb_id]
+                self.cache_misses += 1
+                return None
+
+            self.cache_hits += 1
+            self._cache.move_to_end(tmdb_id)
+            return details
+
+    def _cache_put(self, tmdb_id, details):
+        with self._cache_lock:
+            self._cache[tmdb_id] = (time.monotonic(), details)
+            self._cache.move_to_end(tmdb_id)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def clear_cache(self):
+        with self._cache_lock:
+            self._cache.clear()